@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'compiler.middleware.CompressionMiddleware',  # brotli/gzip for large responses
+    'compiler.middleware.PreflightMiddleware',  # toolchain warm-up on each worker's first request
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -142,12 +144,96 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'compiler.renderers.FastJSONRenderer',  # orjson when installed
     ],
 }
 
-# Temporary files directory for code compilation
+# Temporary files directory for code compilation (created by the preflight step)
 import os
 TEMP_FILES_DIR = os.path.join(BASE_DIR, 'temp_files')
-if not os.path.exists(TEMP_FILES_DIR):
-    os.makedirs(TEMP_FILES_DIR)
+
+# Namespace sandbox for submitted programs (see compiler/sandbox.py).
+# Each run joins a pre-warmed context with private user/mount/net/pid
+# namespaces, a read-only view of READONLY_PATHS and a writable scratch dir.
+# POOL_SIZE contexts are kept warm; the pool grows up to MAX_POOL_SIZE while
+# more runs than that are waiting, and shrinks back once they finish.
+# When namespaces are unavailable, runs fall back to plain subprocesses
+# unless REQUIRED is set.
+EXECUTION_SANDBOX = {
+    'ENABLED': True,
+    'REQUIRED': False,
+    'POOL_SIZE': 4,
+    'MAX_POOL_SIZE': 64,
+    'MAX_USES': 50,
+    'READONLY_PATHS': ['/usr', '/bin', '/lib', '/lib64', '/etc'],
+}
+
+# CPU affinity for stable timings (see compiler/scheduler.py).
+# Each timed run is pinned to a dedicated core leased from RUN_CORES;
+# compilers are confined to COMPILE_CORES. Both default to a split of the
+# cores this process may use (a quarter for compilation); setting only one
+# gives the other the remaining cores. Pinning uses taskset (util-linux).
+EXECUTION_CPU_AFFINITY = {
+    'ENABLED': True,
+    'SKIP_HYPERTHREAD_SIBLINGS': True,
+    'COMPILE_CORES': None,
+    'RUN_CORES': None,
+    'ACQUIRE_TIMEOUT': 10,
+}
+
+# Single-flight coalescing (see compiler/coalescing.py). Identical
+# submissions (language, source and input) in flight at the same time on
+# this node share one compile and run; each still gets its own record.
+# Clients can opt out per request with "coalesce": false. A shared result
+# is deleted from disk RESULT_TTL seconds after its run ends.
+EXECUTION_COALESCING = {
+    'ENABLED': True,
+    'SLOTS': 4096,
+    'WAIT_TIMEOUT': 60,
+    'RESULT_TTL': 5,
+}
+
+# Toolchain preflight (see compiler/toolchain.py and `manage.py preflight`).
+# Each worker process probes g++/python3/javac/java/node in the background
+# from its first request on (PreflightMiddleware), warms each language with
+# a trivial program, and reports ready on /api/health/ only once that has
+# finished. Other processes (management commands, tests) never start it.
+EXECUTION_PREFLIGHT = {
+    'ENABLED': True,
+    'WARM_UP': True,
+}
+
+# Program input limits (see compiler/uploads.py). Large inputs can be
+# uploaded as an ``input_file`` multipart part; they are spooled to disk,
+# hashed while streaming, rejected with 413 once MAX_SIZE bytes are passed,
+# and fed to the program's stdin straight from the file.
+EXECUTION_INPUT = {
+    'MAX_SIZE': 64 * 1024 * 1024,
+}
+
+# Per-node time-limit calibration (see compiler/calibration.py and
+# `manage.py calibrate_node`). The run limit of a submission is
+# EXECUTION_TIMEOUT x the language multiplier x this node's measured speed
+# factor for the language, so verdicts do not depend on which node ran it.
+# Results report the raw run time and the time normalised to the reference node.
+EXECUTION_CALIBRATION = {
+    'ENABLED': True,
+    'NODE_NAME': None,  # defaults to the host name
+    'LANGUAGE_MULTIPLIERS': {
+        'cpp': 1.0,
+        'java': 1.5,
+        'javascript': 1.5,
+        'python': 2.0,
+    },
+    'CACHE_SECONDS': 300,
+}
+
+# Opt-in profile mode (see compiler/profiling.py). Requests with
+# "profile": true run under cProfile (Python), gprof (C++, built with -pg),
+# V8 --cpu-prof (JavaScript) or JFR (Java) within the usual time limit; the
+# response lists the TOP_N functions by self time and the raw profile is
+# downloadable from /api/execute/<id>/profile/.
+EXECUTION_PROFILING = {
+    'ENABLED': True,
+    'TOP_N': 20,
+}
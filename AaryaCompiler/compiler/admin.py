@@ -2,7 +2,11 @@
 # Created by Aarya Agarwal
 
 from django.contrib import admin
-from .models import CodeExecution
+from django.db.models import Q
+import uuid
+
+from .models import CodeExecution, NodeCalibration, StressTest
+from . import search
 
 @admin.register(CodeExecution)
 class CodeExecutionAdmin(admin.ModelAdmin):
@@ -20,12 +24,18 @@ class CodeExecutionAdmin(admin.ModelAdmin):
         'language', 'status', 'created_at', 'completed_at'
     ]
     
+    # Code and output are searched through the full-text index (see get_search_results)
     search_fields = [
-        'id', 'source_code', 'output', 'error_output'
+        'id'
     ]
     
+    # Maximum number of full-text matches shown for one admin search
+    search_limit = 1000
+    
     readonly_fields = [
-        'id', 'created_at', 'completed_at', 'execution_time', 'memory_used'
+        'id', 'created_at', 'completed_at', 'execution_time', 'run_time',
+        'normalized_run_time', 'time_limit', 'memory_used', 'assigned_core', 'coalesced_from',
+        'profile_report'
     ]
     
     fieldsets = [
@@ -40,8 +50,13 @@ class CodeExecutionAdmin(admin.ModelAdmin):
             'fields': ('output', 'error_output'),
             'classes': ('collapse',)
         }),
+        ('Profile', {
+            'fields': ('profile_report',),
+            'classes': ('collapse',)
+        }),
         ('Performance', {
-            'fields': ('execution_time', 'memory_used'),
+            'fields': ('execution_time', 'run_time', 'normalized_run_time', 'time_limit',
+                       'memory_used', 'assigned_core', 'coalesced_from'),
             'classes': ('collapse',)
         })
     ]
@@ -60,6 +75,87 @@ class CodeExecutionAdmin(admin.ModelAdmin):
     has_errors.boolean = True
     has_errors.short_description = 'Has Errors'
     
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search source code and output through the full-text index instead of
+        LIKE scans over the large text columns. Falls back to LIKE scans on
+        databases without an index. An exact execution id also matches.
+        """
+        if not search_term.strip():
+            return queryset, False
+        
+        ids = search.search_execution_ids(search_term, limit=self.search_limit)
+        if ids is None:
+            query = Q()
+            for field in search.SEARCH_FIELDS:
+                query |= Q(**{f'{field}__icontains': search_term})
+        else:
+            query = Q(id__in=ids)
+        
+        try:
+            query |= Q(id=uuid.UUID(search_term.strip()))
+        except ValueError:
+            pass
+        
+        return queryset.filter(query), False
+    
     def get_queryset(self, request):
-        """Optimize queryset for admin list view"""
-        return super().get_queryset(request).select_related()
+        """Optimize queryset for admin list view (archived output and profiles are never shown)"""
+        return super().get_queryset(request).select_related().defer(
+            'output_archive', 'error_output_archive', 'profile_archive'
+        )
+
+
+@admin.register(StressTest)
+class StressTestAdmin(admin.ModelAdmin):
+    """
+    Admin interface for StressTest model.
+    """
+    
+    list_display = [
+        'id', 'status', 'verdict', 'iterations_run', 'iterations',
+        'elapsed_time', 'created_at'
+    ]
+    
+    list_filter = [
+        'status', 'verdict', 'created_at'
+    ]
+    
+    readonly_fields = [
+        'id', 'created_at', 'completed_at', 'elapsed_time', 'iterations_run'
+    ]
+    
+    fieldsets = [
+        ('Basic Information', {
+            'fields': ('id', 'status', 'verdict', 'iterations', 'start_seed',
+                       'iterations_run', 'elapsed_time', 'created_at', 'completed_at')
+        }),
+        ('Programs', {
+            'fields': ('generator_language', 'generator_source', 'brute_language',
+                       'brute_source', 'solution_language', 'solution_source'),
+            'classes': ('collapse',)
+        }),
+        ('Counterexample', {
+            'fields': ('failing_seed', 'failing_input', 'expected_output',
+                       'actual_output', 'error_output'),
+            'classes': ('collapse',)
+        })
+    ]
+    
+    date_hierarchy = 'created_at'
+
+
+@admin.register(NodeCalibration)
+class NodeCalibrationAdmin(admin.ModelAdmin):
+    """
+    Admin interface for NodeCalibration model.
+    Rows are written by the calibrate_node management command.
+    """
+    
+    list_display = [
+        'node', 'language', 'speed_factor', 'measured_time', 'reference_time', 'calibrated_at'
+    ]
+    
+    list_filter = [
+        'node', 'language'
+    ]
@@ -0,0 +1,128 @@
+# AaryaOnlineCompiler - Per-Node Time-Limit Calibration
+# Created by Aarya Agarwal
+
+import socket
+import threading
+import time
+from typing import Dict, Optional
+from django.conf import settings
+
+# The same fixed CPU-bound loop in every language, sized to run for about
+# half a second on the reference node
+REFERENCE_WORKLOADS = {
+    'cpp': r'''
+#include <cstdio>
+int main() {
+    unsigned int x = 1;
+    for (int i = 0; i < 200000000; ++i) {
+        x = (x * 1103515245u + 12345u) & 0x7fffffffu;
+    }
+    std::printf("%u\n", x);
+}
+''',
+    'java': r'''
+public class Main {
+    public static void main(String[] args) {
+        int x = 1;
+        for (int i = 0; i < 200000000; ++i) {
+            x = (x * 1103515245 + 12345) & 0x7fffffff;
+        }
+        System.out.println(x);
+    }
+}
+''',
+    'python': r'''
+x = 1
+for _ in range(5000000):
+    x = (x * 1103515245 + 12345) & 0x7fffffff
+print(x)
+''',
+    'javascript': r'''
+let x = 1;
+for (let i = 0; i < 200000000; ++i) {
+    x = (Math.imul(x, 1103515245) + 12345) & 0x7fffffff;
+}
+console.log(x);
+''',
+}
+
+# Run time of each workload in seconds on the reference node; a node that
+# matches these exactly has a speed factor of 1.0
+REFERENCE_TIMES = {
+    'cpp': 0.45,
+    'java': 0.5,
+    'python': 0.8,
+    'javascript': 0.5,
+}
+
+_factors = {}
+_factors_loaded_at = None
+_factors_lock = threading.Lock()
+
+
+def _config() -> Dict:
+    return getattr(settings, 'EXECUTION_CALIBRATION', {})
+
+
+def node_name() -> str:
+    """Name calibrations are stored under: NODE_NAME, or the host name"""
+    return _config().get('NODE_NAME') or socket.gethostname()
+
+
+def get_factors() -> Dict[str, float]:
+    """
+    Speed factors of this node per language (measured time / reference
+    time). Read from the database and cached for CACHE_SECONDS; languages
+    without a calibration are missing from the result.
+    """
+    global _factors, _factors_loaded_at
+
+    config = _config()
+    if not config.get('ENABLED', False):
+        return {}
+
+    with _factors_lock:
+        now = time.monotonic()
+        if _factors_loaded_at is None or now - _factors_loaded_at >= config.get('CACHE_SECONDS', 300):
+            # Imported here because models are not ready when settings import this module
+            from .models import NodeCalibration
+            _factors = dict(
+                NodeCalibration.objects.filter(node=node_name()).values_list('language', 'speed_factor')
+            )
+            _factors_loaded_at = now
+        return dict(_factors)
+
+
+def invalidate():
+    """Drop cached factors so the next lookup re-reads the database"""
+    global _factors_loaded_at
+    with _factors_lock:
+        _factors_loaded_at = None
+
+
+def get_limits(language: str, base_timeout: float, factors: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    Time limit for ``language`` on this node and the factor used to
+    normalise run times: ``base_timeout`` scaled by the configured language
+    multiplier and the node's measured speed factor for that language.
+    With calibration disabled every language gets ``base_timeout``.
+    """
+    config = _config()
+    if not config.get('ENABLED', False):
+        return {'time_limit': base_timeout, 'speed_factor': 1.0}
+
+    if factors is None:
+        factors = get_factors()
+    multiplier = config.get('LANGUAGE_MULTIPLIERS', {}).get(language, 1.0)
+    speed_factor = factors.get(language, 1.0)
+    return {
+        'time_limit': round(base_timeout * multiplier * speed_factor, 3),
+        'speed_factor': speed_factor,
+    }
+
+
+def normalize(run_time: Optional[float], speed_factor: float) -> Optional[float]:
+    """Convert a run time on this node into the equivalent on the reference node"""
+    if run_time is None:
+        return None
+    return run_time / speed_factor
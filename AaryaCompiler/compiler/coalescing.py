@@ -0,0 +1,269 @@
+# AaryaOnlineCompiler - Single-Flight Coalescing
+# Created by Aarya Agarwal
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """A run this process leads; identical submissions wait for its outcome"""
+
+    def __init__(self, coalescer: 'Coalescer', key: str, fd: int):
+        self.coalescer = coalescer
+        self.key = key
+        self.fd = fd
+
+    def finish(self, execution_id: str, outcome: Dict):
+        """Publish the outcome to waiting followers and end the flight"""
+        try:
+            self.coalescer._write_outcome(self.key, {
+                'key': self.key,
+                'execution_id': execution_id,
+                'finished_at': time.time(),
+                'outcome': outcome,
+            })
+        finally:
+            self.abort()
+        self.coalescer._expire_later(self.key, execution_id)
+
+    def abort(self):
+        """End the flight without a result; followers will run on their own"""
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+
+
+class Coalescer:
+    """
+    Node-wide single-flight for identical submissions.
+
+    The first request for a key takes an exclusive flock() on the key's slot
+    file and does the work; identical requests arriving meanwhile find the
+    lock held, wait for a shared lock, and read the outcome the leader wrote
+    next to the slot before unlocking. Keys hash onto a fixed number of
+    slots so the lock directory stays bounded; the stored key is checked, so
+    a slot collision only costs a wait, never a wrong result. Outcomes hold
+    program output, so each is deleted ``result_ttl`` seconds after its
+    flight ends, once no follower is still reading it.
+    """
+
+    # How often waiting followers re-check the slot lock
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, lock_dir: str, slots: int, wait_timeout: float, result_ttl: float = 5):
+        self.lock_dir = lock_dir
+        self.slots = slots
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self._expiring = deque()
+        self._expiring_changed = threading.Condition()
+        self._janitor_pid = None
+        os.makedirs(lock_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            data = part.encode('utf-8')
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _slot_path(self, key: str) -> str:
+        return os.path.join(self.lock_dir, str(int(key[:16], 16) % self.slots))
+
+    def _write_outcome(self, key: str, record: Dict):
+        path = self._slot_path(key) + '.result'
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}'
+        with open(temp_path, 'wb') as f:
+            f.write(zlib.compress(json.dumps(record).encode('utf-8')))
+        os.replace(temp_path, path)
+
+    def _read_outcome(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._slot_path(key) + '.result', 'rb') as f:
+                return json.loads(zlib.decompress(f.read()))
+        except (OSError, ValueError, zlib.error):
+            return None
+
+    def _expire_later(self, key: str, execution_id: str):
+        """Queue a flight's outcome for deletion once followers had time to read it"""
+        with self._expiring_changed:
+            self._expiring.append((time.monotonic() + self.result_ttl, key, execution_id))
+            # One janitor thread per process; threads do not survive a fork
+            if self._janitor_pid != os.getpid():
+                self._janitor_pid = os.getpid()
+                threading.Thread(target=self._expire_outcomes, daemon=True).start()
+            self._expiring_changed.notify()
+
+    def _expire_outcomes(self):
+        """Janitor loop: delete queued outcomes as they come due"""
+        while True:
+            with self._expiring_changed:
+                while not self._expiring:
+                    self._expiring_changed.wait()
+                due, key, execution_id = self._expiring[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._expiring_changed.wait(delay)
+                    continue
+                self._expiring.popleft()
+            try:
+                if not self._expire(key, execution_id):
+                    with self._expiring_changed:
+                        self._expiring.append((time.monotonic() + self.result_ttl, key, execution_id))
+            except OSError as e:
+                logger.error(f"Failed to expire a coalesced result: {str(e)}")
+
+    def _expire(self, key: str, execution_id: str) -> bool:
+        """
+        Delete the outcome ``execution_id``'s flight published for ``key``.
+        Returns False when the slot is locked (a follower is reading or a
+        new flight is running), so the caller can try again later.
+        """
+        try:
+            fd = os.open(self._slot_path(key) + '.lock', os.O_RDWR)
+        except FileNotFoundError:
+            # The lock directory was cleared, and the outcome with it
+            return True
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            record = self._read_outcome(key)
+            # A later flight on the slot owns (and expires) its own outcome
+            if record is not None and record['execution_id'] == execution_id:
+                try:
+                    os.unlink(self._slot_path(key) + '.result')
+                except FileNotFoundError:
+                    pass
+            return True
+        finally:
+            os.close(fd)
+
+    def lead(self, key: str) -> Optional[Flight]:
+        """Start a flight for ``key``, or return None if one is already in progress"""
+        fd = os.open(self._slot_path(key) + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+
+        # Drop the previous flight's outcome so late followers cannot pick it up
+        try:
+            os.unlink(self._slot_path(key) + '.result')
+        except FileNotFoundError:
+            pass
+        return Flight(self, key, fd)
+
+    def wait(self, key: str, arrived_at: float, timeout: float) -> Optional[Dict]:
+        """
+        Wait for the flight in progress for ``key`` and return its record.
+        Returns None on timeout, when the leader failed, or when the result
+        belongs to another key or to a flight that ended before we arrived.
+        """
+        fd = os.open(self._slot_path(key) + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        return None
+                    time.sleep(self.POLL_INTERVAL)
+
+            record = self._read_outcome(key)
+        finally:
+            os.close(fd)
+
+        if record is None or record['key'] != key or record['finished_at'] < arrived_at:
+            return None
+        return record
+
+    def run(self, key: str, execution_id: str,
+            work: Callable[[], Dict]) -> Tuple[Dict, Optional[str]]:
+        """
+        Run ``work`` once per concurrent group of identical keys.
+        Returns ``(outcome, leader_execution_id)``; the leader id is None
+        when this call did the work itself.
+        """
+        arrived_at = time.time()
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            flight = self.lead(key)
+            if flight is not None:
+                try:
+                    outcome = work()
+                except BaseException:
+                    flight.abort()
+                    raise
+                flight.finish(execution_id, outcome)
+                return outcome, None
+
+            record = self.wait(key, arrived_at, deadline - time.monotonic())
+            if record is not None:
+                return record['outcome'], record['execution_id']
+
+        logger.warning("Gave up waiting for an identical in-flight run; running independently")
+        return work(), None
+
+    async def arun(self, key: str, execution_id: str,
+                   work: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, Optional[str]]:
+        """Async version of ``run``; waiting happens in a worker thread"""
+        arrived_at = time.time()
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            flight = self.lead(key)
+            if flight is not None:
+                try:
+                    outcome = await work()
+                except BaseException:
+                    flight.abort()
+                    raise
+                flight.finish(execution_id, outcome)
+                return outcome, None
+
+            record = await asyncio.to_thread(self.wait, key, arrived_at, deadline - time.monotonic())
+            if record is not None:
+                return record['outcome'], record['execution_id']
+
+        logger.warning("Gave up waiting for an identical in-flight run; running independently")
+        return await work(), None
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def get_coalescer() -> Optional[Coalescer]:
+    """Return the node's coalescer, or None when coalescing is disabled"""
+    global _coalescer
+
+    config = getattr(settings, 'EXECUTION_COALESCING', {})
+    if not config.get('ENABLED', False):
+        return None
+
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = Coalescer(
+                lock_dir=os.path.join(settings.TEMP_FILES_DIR, 'inflight'),
+                slots=config.get('SLOTS', 4096),
+                wait_timeout=config.get('WAIT_TIMEOUT', 60),
+                result_ttl=config.get('RESULT_TTL', 5)
+            )
+        return _coalescer
@@ -0,0 +1,86 @@
+# AaryaOnlineCompiler - CPU Affinity Variance Benchmark
+# Created by Aarya Agarwal
+
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from compiler import scheduler
+from compiler.services import CodeExecutionService
+
+# A fixed CPU-bound workload; the printed value keeps the loop from being optimised away
+WORKLOAD = r'''
+#include <cstdio>
+int main() {
+    unsigned long long x = 1;
+    for (unsigned long long i = 0; i < 300000000ULL; ++i) {
+        x = x * 6364136223846793005ULL + 1442695040888963407ULL;
+    }
+    std::printf("%llu\n", x);
+}
+'''
+
+
+class Command(BaseCommand):
+    """
+    Show the spread of run times for the same program with and without
+    core pinning. Runs a fixed C++ workload many times with several runs in
+    flight at once, first unpinned (the OS scheduler migrates them freely)
+    and then leasing a dedicated core per run from the run core pool.
+    """
+    help = 'Compare timing variance of concurrent runs before and after CPU pinning'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Runs per variant')
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count(),
+                            help='Runs in flight at once')
+
+    def handle(self, *args, **options):
+        if not settings.EXECUTION_CPU_AFFINITY.get('ENABLED', False):
+            raise CommandError('EXECUTION_CPU_AFFINITY is disabled')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_file = os.path.join(temp_dir, 'main.cpp')
+            executable_file = os.path.join(temp_dir, 'main')
+            with open(source_file, 'w') as f:
+                f.write(WORKLOAD)
+            returncode, _, stderr = CodeExecutionService._run_process(
+                ['g++', '-O2', '-o', executable_file, source_file]
+            )
+            if returncode != 0:
+                raise CommandError(f'Failed to compile the workload:\n{stderr}')
+
+            def unpinned(_):
+                start = time.perf_counter()
+                CodeExecutionService._run_process([executable_file])
+                return time.perf_counter() - start
+
+            def pinned(_):
+                with scheduler.run_core() as core:
+                    start = time.perf_counter()
+                    CodeExecutionService._run_process(
+                        [executable_file], cores=[core] if core is not None else None
+                    )
+                    return time.perf_counter() - start
+
+            self.stdout.write(
+                f'{options["runs"]} runs, {options["concurrency"]} in flight, '
+                f'run cores: {scheduler._get_layout()["run_pool"].cores}'
+            )
+            for label, run in (('unpinned', unpinned), ('pinned', pinned)):
+                with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                    samples = list(pool.map(run, range(options['runs'])))
+                self._report(label, samples)
+
+    def _report(self, label, samples):
+        mean = statistics.mean(samples)
+        stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+        self.stdout.write(
+            f'{label:<10} mean={mean * 1000:8.1f} ms  stdev={stdev * 1000:7.1f} ms  '
+            f'cv={stdev / mean * 100:5.1f}%  '
+            f'min={min(samples) * 1000:8.1f} ms  max={max(samples) * 1000:8.1f} ms'
+        )
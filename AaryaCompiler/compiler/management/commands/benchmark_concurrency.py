@@ -0,0 +1,89 @@
+# AaryaOnlineCompiler - Concurrency Benchmark
+# Created by Aarya Agarwal
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+
+from compiler.services import CodeExecutionService
+
+
+def _read_proc_status():
+    """Return (VmRSS KB, VmSize KB, thread count) for the current process"""
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'VmSize', 'Threads'):
+                values[key] = int(value.split()[0])
+    return values['VmRSS'], values['VmSize'], values['Threads']
+
+
+class Command(BaseCommand):
+    """
+    Compare the web-tier cost of supervising many in-flight executions.
+
+    The WSGI model is simulated with one blocking ``subprocess.run`` per
+    thread (as a threaded WSGI worker would do), the ASGI model with one
+    asyncio task per execution on a single event loop. Each child simply
+    sleeps, so the numbers reflect supervision overhead only.
+    """
+    help = 'Compare memory per in-flight execution under WSGI (threads) and ASGI (asyncio)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help='Number of simultaneous executions')
+        parser.add_argument('--duration', type=float, default=2.0,
+                            help='Seconds each child process stays alive')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        command = [sys.executable, '-c', f"import time; time.sleep({options['duration']})"]
+
+        def run_threads():
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(lambda _: CodeExecutionService._run_process(command), range(concurrency)))
+
+        def run_asyncio():
+            async def main():
+                await asyncio.gather(*(
+                    CodeExecutionService._arun_process(command) for _ in range(concurrency)
+                ))
+            asyncio.run(main())
+
+        self.stdout.write(f'In-flight executions: {concurrency}')
+        for label, workload in (('WSGI (thread per run)', run_threads), ('ASGI (asyncio)', run_asyncio)):
+            report = self._measure(workload)
+            self.stdout.write(
+                f'{label:<24} '
+                f'rss/run={report["rss"] / concurrency:8.1f} KB  '
+                f'vsz/run={report["vsz"] / concurrency:8.1f} KB  '
+                f'peak threads={report["threads"]:4d}  '
+                f'wall={report["wall"]:.2f}s'
+            )
+
+    def _measure(self, workload):
+        """Run a workload in the background while sampling this process"""
+        base_rss, base_vsz, _ = _read_proc_status()
+        peak_rss, peak_vsz, peak_threads = base_rss, base_vsz, 0
+
+        worker = threading.Thread(target=workload)
+        start = time.perf_counter()
+        worker.start()
+        while worker.is_alive():
+            rss, vsz, threads = _read_proc_status()
+            peak_rss = max(peak_rss, rss)
+            peak_vsz = max(peak_vsz, vsz)
+            peak_threads = max(peak_threads, threads)
+            time.sleep(0.02)
+        worker.join()
+
+        return {
+            'rss': peak_rss - base_rss,
+            'vsz': peak_vsz - base_vsz,
+            'threads': peak_threads,
+            'wall': time.perf_counter() - start,
+        }
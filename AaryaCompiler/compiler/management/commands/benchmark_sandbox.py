@@ -0,0 +1,77 @@
+# AaryaOnlineCompiler - Sandbox Overhead Benchmark
+# Created by Aarya Agarwal
+
+import os
+import shutil
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from compiler.sandbox import SandboxContext, SandboxPool
+from compiler.services import CodeExecutionService
+
+
+class Command(BaseCommand):
+    """
+    Measure what the namespace sandbox adds to a single run.
+
+    Compares a bare ``subprocess`` run of a trivial command with the same
+    command leased from a pre-warmed pool (lease + nsenter + scratch reset),
+    and reports how long building a context from scratch takes, which is
+    the cost the pre-warming hides from requests.
+    """
+    help = 'Report per-run setup overhead of the namespace sandbox versus plain subprocesses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=200, help='Runs per variant')
+        parser.add_argument('--command', nargs='+', default=['true'], help='Command to run')
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        command = options['command']
+        base_dir = os.path.join(settings.TEMP_FILES_DIR, 'sandbox-benchmark')
+        readonly_paths = settings.EXECUTION_SANDBOX.get('READONLY_PATHS', ['/usr', '/bin', '/lib', '/lib64', '/etc'])
+
+        bare = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            CodeExecutionService._run_process(command)
+            bare.append(time.perf_counter() - start)
+
+        cold = []
+        for i in range(min(runs, 20)):
+            context = SandboxContext(os.path.join(base_dir, f'cold-{i}'), readonly_paths)
+            start = time.perf_counter()
+            context.start()
+            cold.append(time.perf_counter() - start)
+            context.terminate()
+
+        pool = SandboxPool(base_dir, size=1, max_uses=runs + 1, readonly_paths=readonly_paths)
+        pool.start()
+        warm = []
+        try:
+            for _ in range(runs):
+                start = time.perf_counter()
+                with pool.lease(CodeExecutionService.EXECUTION_TIMEOUT) as context:
+                    CodeExecutionService._run_process(command, cwd=context.scratch_dir, sandbox=context)
+                warm.append(time.perf_counter() - start)
+        finally:
+            pool.shutdown()
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+        self.stdout.write(f'Command: {" ".join(command)} ({runs} runs)')
+        self._report('unsandboxed subprocess', bare)
+        self._report('pre-warmed sandbox', warm)
+        self._report('cold context setup', cold)
+        overhead = (statistics.median(warm) - statistics.median(bare)) * 1000
+        self.stdout.write(f'Median per-run overhead of the pre-warmed sandbox: {overhead:.2f} ms')
+
+    def _report(self, label, samples):
+        samples = sorted(samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        self.stdout.write(
+            f'{label:<24} mean={statistics.mean(samples) * 1000:7.2f} ms  '
+            f'p50={statistics.median(samples) * 1000:7.2f} ms  '
+            f'p95={p95 * 1000:7.2f} ms'
+        )
@@ -0,0 +1,99 @@
+# AaryaOnlineCompiler - Node Calibration Command
+# Created by Aarya Agarwal
+
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from compiler import calibration, scheduler, toolchain
+from compiler.models import NodeCalibration
+from compiler.services import CodeExecutionService
+
+
+class Command(BaseCommand):
+    """
+    Measure how fast this node runs a fixed reference workload in each
+    language and store the speed factors used to scale time limits. The
+    workload runs the same way submissions do (same compiler flags, sandbox
+    and core pinning); the median of several runs is compared with the
+    reference time. Re-run after hardware or toolchain changes.
+    """
+    help = 'Calibrate per-language time limits for this node'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Timed runs per language')
+        parser.add_argument('--language', action='append', choices=sorted(calibration.REFERENCE_WORKLOADS),
+                            help='Calibrate only this language (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Measure without saving')
+
+    def handle(self, *args, **options):
+        if not settings.EXECUTION_CALIBRATION.get('ENABLED', False):
+            self.stdout.write(self.style.WARNING(
+                'EXECUTION_CALIBRATION is disabled; factors are stored but not applied'
+            ))
+
+        node = calibration.node_name()
+        toolchain.probe_tools()
+        self.stdout.write(f'Calibrating {node} ({options["runs"]} runs per language)')
+
+        calibrated = 0
+        for language in options['language'] or calibration.REFERENCE_WORKLOADS:
+            missing = toolchain.missing_tools(language)
+            if missing:
+                self.stdout.write(self.style.WARNING(
+                    f'{language:<10} skipped, missing {", ".join(missing)}'
+                ))
+                continue
+
+            measured = statistics.median(self._measure(language, options['runs']))
+            reference = calibration.REFERENCE_TIMES[language]
+            speed_factor = measured / reference
+            self.stdout.write(
+                f'{language:<10} median={measured:.3f}s  reference={reference:.3f}s  '
+                f'factor={speed_factor:.2f}'
+            )
+            if not options['dry_run']:
+                NodeCalibration.objects.update_or_create(
+                    node=node, language=language,
+                    defaults={
+                        'reference_time': reference,
+                        'measured_time': measured,
+                        'speed_factor': speed_factor,
+                        'calibrated_at': timezone.now(),
+                    }
+                )
+            calibrated += 1
+
+        if not calibrated:
+            raise CommandError('No language could be calibrated')
+        calibration.invalidate()
+        self.stdout.write(self.style.SUCCESS('Calibration finished'))
+
+    def _measure(self, language, runs):
+        """Compile the workload once and return the run time of each run"""
+        with CodeExecutionService._workspace() as (temp_dir, sandbox):
+            program = CodeExecutionService._prepare_program(
+                language, calibration.REFERENCE_WORKLOADS[language], temp_dir
+            )
+            if program['compile']:
+                returncode, _, stderr = CodeExecutionService._run_process(
+                    program['compile'], cwd=program['cwd'], sandbox=sandbox,
+                    cores=scheduler.compile_cores()
+                )
+                if returncode != 0:
+                    raise CommandError(f'Failed to compile the {language} workload:\n{stderr}')
+
+            samples = []
+            for _ in range(runs):
+                with scheduler.run_core() as core:
+                    start = time.perf_counter()
+                    returncode, _, stderr = CodeExecutionService._run_process(
+                        program['run'], cwd=program['cwd'], sandbox=sandbox,
+                        cores=[core] if core is not None else None
+                    )
+                    samples.append(time.perf_counter() - start)
+                if returncode != 0:
+                    raise CommandError(f'The {language} workload failed:\n{stderr}')
+            return samples
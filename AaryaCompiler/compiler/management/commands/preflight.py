@@ -0,0 +1,43 @@
+# AaryaOnlineCompiler - Toolchain Preflight Command
+# Created by Aarya Agarwal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from compiler import toolchain
+
+
+class Command(BaseCommand):
+    """
+    Probe the compilers and runtimes, then warm each language up with a
+    trivial program. Useful as a deploy step or container start-up check;
+    server processes also do this on their own when they start.
+    """
+    help = 'Check toolchain availability and versions and warm up every language'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-warmup', action='store_true',
+                            help='Only probe tool paths and versions')
+        parser.add_argument('--strict', action='store_true',
+                            help='Exit with an error if any language is unavailable')
+
+    def handle(self, *args, **options):
+        readiness = toolchain.run_preflight(warm=not options['skip_warmup'])
+
+        for name, info in readiness['tools'].items():
+            if info['available']:
+                self.stdout.write(f'{name:<8} {info["path"]}  ({info["version"]})')
+            else:
+                self.stdout.write(self.style.WARNING(f'{name:<8} not available'))
+
+        for language, result in readiness['warmup'].items():
+            if result['ok']:
+                self.stdout.write(f'warm-up {language:<10} ok in {result["seconds"]:.3f}s')
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'warm-up {language:<10} failed: {result.get("error", "")}'
+                ))
+
+        unavailable = [language for language, ok in readiness['languages'].items() if not ok]
+        if unavailable and options['strict']:
+            raise CommandError(f'Unavailable languages: {", ".join(unavailable)}')
+        self.stdout.write(self.style.SUCCESS('Preflight finished'))
@@ -0,0 +1,27 @@
+# AaryaOnlineCompiler - Search Index Backfill
+# Created by Aarya Agarwal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from compiler import search
+
+
+class Command(BaseCommand):
+    """
+    Index executions that predate the full-text index (or rebuild it).
+    New executions are indexed automatically as they complete.
+    """
+    help = 'Backfill or rebuild the full-text search index for code executions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows indexed per transaction')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stderr.write(f'No full-text index for the {connection.vendor} backend; nothing to do')
+            return
+
+        processed = search.rebuild_index(options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({processed} executions)'))
@@ -0,0 +1,93 @@
+# AaryaOnlineCompiler - Middleware
+# Created by Aarya Agarwal
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+from . import toolchain
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Negotiated response compression.
+    Uses brotli when the client accepts it and the ``brotli`` package is
+    installed, otherwise falls back to Django's gzip handling. Partial
+    content (206) responses are left untouched so byte ranges stay valid,
+    and so are streaming responses: the compressor holds chunks back until
+    it has a full block, which would stall progress streams like the NDJSON
+    events of a stress test until the job ends.
+    """
+    
+    # Brotli quality: 5 gives most of the size win at a fraction of the CPU of 11
+    BROTLI_QUALITY = 5
+    
+    def process_response(self, request, response):
+        if response.status_code == 206 or response.streaming:
+            return response
+        
+        ae = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if (
+            brotli is None
+            or not re_accepts_brotli.search(ae)
+            or response.has_header('Content-Encoding')
+            or len(response.content) < 200
+        ):
+            return super().process_response(request, response)
+        
+        patch_vary_headers(response, ('Accept-Encoding',))
+        
+        compressed_content = brotli.compress(response.content, quality=self.BROTLI_QUALITY)
+        # Return the uncompressed response if compression doesn't help
+        if len(compressed_content) >= len(response.content):
+            return response
+        
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+        
+        # If there is a strong ETag, make it weak to fulfill the requirements
+        # of RFC 9110 Section 8.8.1 while also allowing conditional request
+        # matches on ETags.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        
+        return response
+
+
+class PreflightMiddleware:
+    """
+    Start toolchain preflight (see compiler/toolchain.py) in a worker
+    process on its first request. Until it has finished, /api/health/
+    answers 503, so the first health check of each worker kicks it off.
+    Async-capable: a sync-only middleware would make Django run every
+    request under ASGI, async views included, on its single thread for
+    sync code, one after another.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        toolchain.ensure_preflight()
+        return self.get_response(request)
+    
+    async def __acall__(self, request):
+        # ensure_preflight only starts a thread, so it is safe on the event loop
+        toolchain.ensure_preflight()
+        return await self.get_response(request)
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compiler', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codeexecution',
+            name='error_output_archive',
+            field=models.BinaryField(blank=True, help_text='Full error messages, zlib-compressed', null=True),
+        ),
+        migrations.AddField(
+            model_name='codeexecution',
+            name='error_output_size',
+            field=models.BigIntegerField(default=0, help_text='Total size of error messages in bytes'),
+        ),
+        migrations.AddField(
+            model_name='codeexecution',
+            name='output_archive',
+            field=models.BinaryField(blank=True, help_text='Full program output, zlib-compressed', null=True),
+        ),
+        migrations.AddField(
+            model_name='codeexecution',
+            name='output_size',
+            field=models.BigIntegerField(default=0, help_text='Total size of program output in bytes'),
+        ),
+        migrations.AlterField(
+            model_name='codeexecution',
+            name='error_output',
+            field=models.TextField(blank=True, help_text='Error messages (preview)'),
+        ),
+        migrations.AlterField(
+            model_name='codeexecution',
+            name='output',
+            field=models.TextField(blank=True, help_text='Program output (preview)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compiler', '0002_output_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codeexecution',
+            name='assigned_core',
+            field=models.IntegerField(blank=True, help_text='CPU core the timed run was pinned to', null=True),
+        ),
+    ]
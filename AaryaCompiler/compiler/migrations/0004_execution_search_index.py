@@ -0,0 +1,85 @@
+# Full-text search index over execution source code and output.
+#
+# The index is keyed on execution ids and written by
+# compiler.search.index_execution when an execution completes; there are no
+# triggers on compiler_codeexecution, which Django drops whenever a later
+# migration makes SQLite rebuild that table.
+#
+# SQLite: compiler_codeexecution_search maps each indexed execution id to an
+# INTEGER PRIMARY KEY document id (stable across table rebuilds and VACUUM),
+# and the FTS5 table compiler_codeexecution_fts holds the indexed text under
+# that id. The trigger on the mapping table drops a document when its
+# execution is deleted (which cascades to the mapping row).
+# PostgreSQL: a side table holding a tsvector per completed execution with a
+# GIN index. Other backends get no index and search falls back to LIKE scans.
+# Rows that existed before this migration are indexed by the
+# rebuild_search_index management command.
+
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE TABLE compiler_codeexecution_search (
+        docid integer NOT NULL PRIMARY KEY,
+        execution_id char(32) NOT NULL UNIQUE
+            REFERENCES compiler_codeexecution (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE compiler_codeexecution_fts USING fts5(
+        source_code, output, error_output
+    )
+    """,
+    """
+    CREATE TRIGGER compiler_codeexecution_search_delete
+    AFTER DELETE ON compiler_codeexecution_search BEGIN
+        DELETE FROM compiler_codeexecution_fts WHERE rowid = old.docid;
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS compiler_codeexecution_search_delete",
+    "DROP TABLE IF EXISTS compiler_codeexecution_fts",
+    "DROP TABLE IF EXISTS compiler_codeexecution_search",
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE TABLE compiler_codeexecution_search (
+        execution_id uuid PRIMARY KEY
+            REFERENCES compiler_codeexecution (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX compiler_codeexecution_search_document
+    ON compiler_codeexecution_search USING GIN (document)
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP TABLE IF EXISTS compiler_codeexecution_search",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compiler', '0003_codeexecution_assigned_core'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}),
+        ),
+    ]
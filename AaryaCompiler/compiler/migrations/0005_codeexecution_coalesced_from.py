@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compiler', '0004_execution_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codeexecution',
+            name='coalesced_from',
+            field=models.UUIDField(blank=True, help_text='Execution whose run was shared with this one (identical submission in flight at the same time)', null=True),
+        ),
+    ]
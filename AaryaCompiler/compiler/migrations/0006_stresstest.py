@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:09
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compiler', '0005_codeexecution_coalesced_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StressTest',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('generator_language', models.CharField(choices=[('cpp', 'C++'), ('python', 'Python'), ('java', 'Java'), ('javascript', 'JavaScript')], max_length=20)),
+                ('generator_source', models.TextField(help_text='Generator; receives the seed as its first argument')),
+                ('brute_language', models.CharField(choices=[('cpp', 'C++'), ('python', 'Python'), ('java', 'Java'), ('javascript', 'JavaScript')], max_length=20)),
+                ('brute_source', models.TextField(help_text='Reference brute-force solution')),
+                ('solution_language', models.CharField(choices=[('cpp', 'C++'), ('python', 'Python'), ('java', 'Java'), ('javascript', 'JavaScript')], max_length=20)),
+                ('solution_source', models.TextField(help_text='Candidate solution under test')),
+                ('iterations', models.PositiveIntegerField(help_text='Number of seeds to try')),
+                ('start_seed', models.BigIntegerField(default=1, help_text='First seed passed to the generator')),
+                ('iterations_run', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('passed', 'Passed'), ('failed', 'Failed'), ('error', 'Error')], default='pending', max_length=20)),
+                ('verdict', models.CharField(blank=True, choices=[('wrong_answer', 'Wrong Answer'), ('runtime_error', 'Runtime Error'), ('timeout', 'Timeout')], max_length=20)),
+                ('failing_seed', models.BigIntegerField(blank=True, null=True)),
+                ('failing_input', models.TextField(blank=True, help_text='Generated input of the counterexample')),
+                ('expected_output', models.TextField(blank=True, help_text='Brute-force output on the counterexample')),
+                ('actual_output', models.TextField(blank=True, help_text='Candidate output on the counterexample')),
+                ('error_output', models.TextField(blank=True, help_text='Error messages')),
+                ('elapsed_time', models.FloatField(blank=True, help_text='Wall time in seconds', null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Stress Test',
+                'verbose_name_plural': 'Stress Tests',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compiler', '0006_stresstest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codeexecution',
+            name='input_sha256',
+            field=models.CharField(blank=True, help_text='SHA-256 of the program input', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='codeexecution',
+            name='input_size',
+            field=models.BigIntegerField(default=0, help_text='Size of the program input in bytes'),
+        ),
+        migrations.AlterField(
+            model_name='codeexecution',
+            name='input_data',
+            field=models.TextField(blank=True, help_text='Input data for the program (empty for uploaded input files)'),
+        ),
+    ]
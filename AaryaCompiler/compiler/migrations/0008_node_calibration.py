@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compiler', '0007_codeexecution_input_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codeexecution',
+            name='normalized_run_time',
+            field=models.FloatField(blank=True, help_text="Run time scaled to the reference node using this node's calibration", null=True),
+        ),
+        migrations.AddField(
+            model_name='codeexecution',
+            name='run_time',
+            field=models.FloatField(blank=True, help_text='Time of the run phase alone in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='codeexecution',
+            name='time_limit',
+            field=models.FloatField(blank=True, help_text='Run time limit applied, in seconds', null=True),
+        ),
+        migrations.CreateModel(
+            name='NodeCalibration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node', models.CharField(help_text='Host name or configured node name', max_length=255)),
+                ('language', models.CharField(choices=[('cpp', 'C++'), ('python', 'Python'), ('java', 'Java'), ('javascript', 'JavaScript')], max_length=20)),
+                ('reference_time', models.FloatField(help_text='Workload run time on the reference node in seconds')),
+                ('measured_time', models.FloatField(help_text='Median workload run time on this node in seconds')),
+                ('speed_factor', models.FloatField(help_text='measured / reference time; above 1 means slower than the reference')),
+                ('calibrated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Node Calibration',
+                'verbose_name_plural': 'Node Calibrations',
+                'ordering': ['node', 'language'],
+                'constraints': [models.UniqueConstraint(fields=('node', 'language'), name='unique_node_language_calibration')],
+            },
+        ),
+    ]
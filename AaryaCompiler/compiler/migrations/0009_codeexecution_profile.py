@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compiler', '0008_node_calibration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codeexecution',
+            name='profile_archive',
+            field=models.BinaryField(blank=True, help_text='Raw profile, zlib-compressed', null=True),
+        ),
+        migrations.AddField(
+            model_name='codeexecution',
+            name='profile_report',
+            field=models.JSONField(blank=True, help_text='Top functions of a profiled run: format, functions and any error', null=True),
+        ),
+    ]
@@ -1,9 +1,13 @@
 # AaryaOnlineCompiler - Compiler Models
 # Created by Aarya Agarwal
 
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
 from django.utils import timezone
 import uuid
+import zlib
+
+from . import search
 
 class CodeExecution(models.Model):
     """
@@ -17,6 +21,9 @@ class CodeExecution(models.Model):
         ('javascript', 'JavaScript'),
     ]
     
+    # Output streams that are stored as a preview plus a compressed archive
+    OUTPUT_STREAMS = ['output', 'error_output']
+    
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('running', 'Running'),
@@ -28,12 +35,34 @@ class CodeExecution(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     language = models.CharField(max_length=20, choices=LANGUAGE_CHOICES, default='cpp')
     source_code = models.TextField(help_text="The source code to be executed")
-    input_data = models.TextField(blank=True, help_text="Input data for the program")
-    output = models.TextField(blank=True, help_text="Program output")
-    error_output = models.TextField(blank=True, help_text="Error messages")
+    input_data = models.TextField(blank=True, help_text="Input data for the program (empty for uploaded input files)")
+    input_size = models.BigIntegerField(default=0, help_text="Size of the program input in bytes")
+    input_sha256 = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the program input")
+    output = models.TextField(blank=True, help_text="Program output (preview)")
+    error_output = models.TextField(blank=True, help_text="Error messages (preview)")
+    output_size = models.BigIntegerField(default=0, help_text="Total size of program output in bytes")
+    error_output_size = models.BigIntegerField(default=0, help_text="Total size of error messages in bytes")
+    output_archive = models.BinaryField(null=True, blank=True, help_text="Full program output, zlib-compressed")
+    error_output_archive = models.BinaryField(null=True, blank=True, help_text="Full error messages, zlib-compressed")
+    profile_report = models.JSONField(
+        null=True, blank=True,
+        help_text="Top functions of a profiled run: format, functions and any error"
+    )
+    profile_archive = models.BinaryField(null=True, blank=True, help_text="Raw profile, zlib-compressed")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     execution_time = models.FloatField(null=True, blank=True, help_text="Execution time in seconds")
+    run_time = models.FloatField(null=True, blank=True, help_text="Time of the run phase alone in seconds")
+    normalized_run_time = models.FloatField(
+        null=True, blank=True,
+        help_text="Run time scaled to the reference node using this node's calibration"
+    )
+    time_limit = models.FloatField(null=True, blank=True, help_text="Run time limit applied, in seconds")
     memory_used = models.IntegerField(null=True, blank=True, help_text="Memory used in KB")
+    assigned_core = models.IntegerField(null=True, blank=True, help_text="CPU core the timed run was pinned to")
+    coalesced_from = models.UUIDField(
+        null=True, blank=True,
+        help_text="Execution whose run was shared with this one (identical submission in flight at the same time)"
+    )
     created_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(null=True, blank=True)
     
@@ -49,10 +78,142 @@ class CodeExecution(models.Model):
     def is_completed(self):
         return self.status in ['completed', 'error', 'timeout']
     
+    def store_output(self, stream: str, text: str, preview_size: int):
+        """
+        Store an output stream as a bounded preview plus its total size.
+        The full text is kept zlib-compressed only when it exceeds the preview.
+        """
+        data = text.encode('utf-8')
+        setattr(self, f'{stream}_size', len(data))
+        if len(data) > preview_size:
+            setattr(self, stream, data[:preview_size].decode('utf-8', errors='ignore'))
+            setattr(self, f'{stream}_archive', zlib.compress(data))
+        else:
+            setattr(self, stream, text)
+            setattr(self, f'{stream}_archive', None)
+    
+    def read_output(self, stream: str) -> bytes:
+        """Return the full contents of an output stream as UTF-8 bytes"""
+        archive = getattr(self, f'{stream}_archive')
+        if archive:
+            return zlib.decompress(archive)
+        return getattr(self, stream).encode('utf-8')
+    
+    def is_output_truncated(self, stream: str) -> bool:
+        """Check if the stored preview is shorter than the full stream"""
+        return len(getattr(self, stream).encode('utf-8')) < getattr(self, f'{stream}_size')
+    
+    def store_profile(self, profile: dict, max_size: int):
+        """
+        Store a profiled run's report and its raw profile, zlib-compressed.
+        Raw profiles larger than ``max_size`` bytes are dropped; the report is kept.
+        """
+        raw = profile.get('raw')
+        report = {key: value for key, value in profile.items() if key != 'raw'}
+        if raw is not None and len(raw) > max_size:
+            report['error'] = report.get('error') or f'Raw profile exceeded {max_size} bytes and was not stored'
+            raw = None
+        report['downloadable'] = raw is not None
+        self.profile_report = report
+        self.profile_archive = zlib.compress(raw) if raw is not None else None
+    
+    def read_profile(self) -> bytes:
+        """Return the raw profile, or empty bytes if none was stored"""
+        if self.profile_archive:
+            return zlib.decompress(self.profile_archive)
+        return b''
+    
     def mark_completed(self):
-        """Mark the execution as completed and set completion time"""
+        """Mark the execution as completed, set completion time and index it for search"""
         if not self.completed_at:
             self.completed_at = timezone.now()
             if self.status == 'pending' or self.status == 'running':
                 self.status = 'completed'
-            self.save()
+            with transaction.atomic():
+                self.save()
+                search.index_execution(self.id)
+    
+    async def amark_completed(self):
+        """Async version of mark_completed for use from async views"""
+        await sync_to_async(self.mark_completed)()
+
+
+
+class NodeCalibration(models.Model):
+    """
+    Measured speed of one node for one language.
+    Written by the calibrate_node management command and used to scale
+    time limits and normalise run times (see compiler/calibration.py).
+    """
+    node = models.CharField(max_length=255, help_text="Host name or configured node name")
+    language = models.CharField(max_length=20, choices=CodeExecution.LANGUAGE_CHOICES)
+    reference_time = models.FloatField(help_text="Workload run time on the reference node in seconds")
+    measured_time = models.FloatField(help_text="Median workload run time on this node in seconds")
+    speed_factor = models.FloatField(help_text="measured / reference time; above 1 means slower than the reference")
+    calibrated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['node', 'language']
+        constraints = [
+            models.UniqueConstraint(fields=['node', 'language'], name='unique_node_language_calibration')
+        ]
+        verbose_name = "Node Calibration"
+        verbose_name_plural = "Node Calibrations"
+    
+    def __str__(self):
+        return f"{self.node} {self.language} x{self.speed_factor:.2f}"
+
+class StressTest(models.Model):
+    """
+    A stress-test job: a generator produces random inputs from seeds, and a
+    reference brute-force solution and the candidate solution are run on
+    each input until their outputs differ or the iterations run out.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('passed', 'Passed'),
+        ('failed', 'Failed'),
+        ('error', 'Error'),
+    ]
+    
+    VERDICT_CHOICES = [
+        ('wrong_answer', 'Wrong Answer'),
+        ('runtime_error', 'Runtime Error'),
+        ('timeout', 'Timeout'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    generator_language = models.CharField(max_length=20, choices=CodeExecution.LANGUAGE_CHOICES)
+    generator_source = models.TextField(help_text="Generator; receives the seed as its first argument")
+    brute_language = models.CharField(max_length=20, choices=CodeExecution.LANGUAGE_CHOICES)
+    brute_source = models.TextField(help_text="Reference brute-force solution")
+    solution_language = models.CharField(max_length=20, choices=CodeExecution.LANGUAGE_CHOICES)
+    solution_source = models.TextField(help_text="Candidate solution under test")
+    iterations = models.PositiveIntegerField(help_text="Number of seeds to try")
+    start_seed = models.BigIntegerField(default=1, help_text="First seed passed to the generator")
+    iterations_run = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    verdict = models.CharField(max_length=20, choices=VERDICT_CHOICES, blank=True)
+    failing_seed = models.BigIntegerField(null=True, blank=True)
+    failing_input = models.TextField(blank=True, help_text="Generated input of the counterexample")
+    expected_output = models.TextField(blank=True, help_text="Brute-force output on the counterexample")
+    actual_output = models.TextField(blank=True, help_text="Candidate output on the counterexample")
+    error_output = models.TextField(blank=True, help_text="Error messages")
+    elapsed_time = models.FloatField(null=True, blank=True, help_text="Wall time in seconds")
+    created_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Stress Test"
+        verbose_name_plural = "Stress Tests"
+    
+    def __str__(self):
+        return f"stress test ({self.status}) at {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+    
+    @property
+    def iterations_per_second(self):
+        if not self.elapsed_time:
+            return None
+        return self.iterations_run / self.elapsed_time
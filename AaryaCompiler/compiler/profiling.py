@@ -0,0 +1,268 @@
+# AaryaOnlineCompiler - Profile Mode
+# Created by Aarya Agarwal
+
+import json
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List
+from django.conf import settings
+
+from . import scheduler, toolchain
+
+# Seconds a profiled program gets after its time limit to write the profile
+DUMP_GRACE = 2
+
+# Exit status of timeout(1) when it had to stop the program
+LIMIT_EXIT_STATUS = 124
+
+# Profiler output format of each language
+PROFILE_FORMATS = {
+    'python': 'pstats',
+    'cpp': 'gprof',
+    'javascript': 'cpuprofile',
+    'java': 'jfr',
+}
+
+# How each raw profile is served for download: (file extension, content type)
+FORMATS = {
+    'pstats': ('prof', 'application/octet-stream'),
+    'gprof': ('txt', 'text/plain; charset=utf-8'),
+    'cpuprofile': ('cpuprofile', 'application/json'),
+    'jfr': ('jfr', 'application/octet-stream'),
+}
+
+# Profile files written next to the program
+PROFILE_FILES = {
+    'python': 'profile.prof',
+    'cpp': 'gmon.out',
+    'javascript': 'profile.cpuprofile',
+    'java': 'profile.jfr',
+}
+
+# Linked into C++ programs: turn the time-limit signal into a normal exit so
+# the gprof runtime still writes gmon.out for programs that run too long
+CPP_EXIT_HOOK = r'''
+#include <csignal>
+#include <cstdlib>
+static void profile_limit_reached(int) { std::exit(130); }
+static struct ProfileExitHook {
+    ProfileExitHook() { std::signal(SIGINT, profile_limit_reached); }
+} profile_exit_hook;
+'''
+
+# Preloaded into Node programs for the same purpose. Signal handlers only run
+# while the event loop is free, so a busy loop that hits the limit is killed
+# after DUMP_GRACE without leaving a profile
+NODE_EXIT_HOOK = "process.on('SIGINT', () => process.exit(130));\n"
+
+# Runs inside the sandbox: pstats loads profiles with marshal, which must
+# not be fed a file the submitted program could have written over
+PSTATS_REPORT = r'''
+import json, os, pstats, sys
+rows = []
+for (filename, line, name), (cc, nc, tt, ct, callers) in pstats.Stats(sys.argv[1]).stats.items():
+    function = name if filename == '~' else f'{name} ({os.path.basename(filename)}:{line})'
+    rows.append({'function': function, 'calls': nc, 'self_time': tt, 'cumulative_time': ct})
+rows.sort(key=lambda row: row['self_time'], reverse=True)
+print(json.dumps(rows[:int(sys.argv[2])]))
+'''
+
+GPROF_LINE = re.compile(
+    r'^\s*[\d.]+\s+[\d.]+\s+([\d.]+)\s+(?:(\d+)\s+[\d.]+\s+([\d.]+)\s+)?(\S.*)$'
+)
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'EXECUTION_PROFILING', {}).get('ENABLED', False)
+
+
+def top_n() -> int:
+    return getattr(settings, 'EXECUTION_PROFILING', {}).get('TOP_N', 20)
+
+
+def instrument(language: str, program: Dict, time_limit: float) -> Dict:
+    """
+    Rewrite a compile/run plan (see CodeExecutionService._prepare_program)
+    to collect a profile. At ``time_limit`` the program is sent SIGINT
+    instead of being killed, so the profiler can save what it has; the
+    caller allows DUMP_GRACE more seconds before killing it.
+    """
+    cwd = program['cwd']
+    profile_path = os.path.join(cwd, PROFILE_FILES[language])
+    compile_command = program['compile']
+    run_command = list(program['run'])
+
+    if language == 'python':
+        run_command[1:1] = ['-m', 'cProfile', '-o', profile_path]
+    elif language == 'cpp':
+        hook_file = os.path.join(cwd, 'profile_hook.cpp')
+        with open(hook_file, 'w') as f:
+            f.write(CPP_EXIT_HOOK)
+        compile_command = compile_command + [hook_file, '-pg']
+    elif language == 'javascript':
+        hook_file = os.path.join(cwd, 'profile_hook.js')
+        with open(hook_file, 'w') as f:
+            f.write(NODE_EXIT_HOOK)
+        run_command[1:1] = [
+            '--cpu-prof', f'--cpu-prof-dir={cwd}', f'--cpu-prof-name={PROFILE_FILES[language]}',
+            '--require', hook_file,
+        ]
+    elif language == 'java':
+        run_command[1:1] = [
+            f'-XX:StartFlightRecording=filename={profile_path},dumponexit=true,settings=profile'
+        ]
+
+    return dict(
+        program,
+        compile=compile_command,
+        run=[toolchain.resolve('timeout'), '--signal=INT', f'{time_limit:g}', *run_command],
+        profile=profile_path,
+    )
+
+
+def hit_limit(returncode: int) -> bool:
+    """Whether an instrumented run was stopped at its time limit"""
+    return returncode == LIMIT_EXIT_STATUS
+
+
+def collect(language: str, program: Dict, sandbox=None) -> Dict:
+    """
+    Read the profile of an instrumented run.
+    Returns ``{'format', 'functions', 'raw', 'error'}``: the top functions by
+    self time (with cumulative time and call counts where the profiler
+    records them), the raw profile bytes for download, and an error message
+    when no profile could be read.
+    """
+    # Imported here because services imports this module
+    from .services import CodeExecutionService
+
+    profile = {'format': PROFILE_FORMATS[language], 'functions': [], 'raw': None, 'error': None}
+    if not os.path.exists(program['profile']):
+        profile['error'] = 'No profile was written; the program was stopped before it could save one'
+        return profile
+
+    def report(command):
+        returncode, stdout, stderr = CodeExecutionService._run_process(
+            command, cwd=program['cwd'], sandbox=sandbox, cores=scheduler.compile_cores()
+        )
+        if returncode != 0:
+            raise RuntimeError(stderr.strip() or f'{os.path.basename(command[0])} failed')
+        return stdout
+
+    def read_raw():
+        with open(program['profile'], 'rb') as f:
+            return f.read()
+
+    try:
+        if language == 'python':
+            profile['functions'] = json.loads(report([
+                toolchain.resolve('python3'), '-c', PSTATS_REPORT, program['profile'], str(top_n())
+            ]))
+            profile['raw'] = read_raw()
+        elif language == 'cpp':
+            # gmon.out is useless without the binary, so the gprof report is kept instead
+            text = report([toolchain.resolve('gprof'), '-b', program['run'][-1], program['profile']])
+            profile['functions'] = parse_gprof(text)
+            profile['raw'] = text.encode('utf-8')
+        elif language == 'javascript':
+            profile['raw'] = read_raw()
+            profile['functions'] = parse_cpuprofile(json.loads(profile['raw']))
+        else:
+            profile['functions'] = parse_jfr(json.loads(report([
+                toolchain.resolve('jfr'), 'print', '--json', '--events', 'jdk.ExecutionSample', program['profile']
+            ])))
+            profile['raw'] = read_raw()
+    except Exception as e:
+        # A profile that cannot be read is reported with the result instead of failing the run
+        profile['error'] = f'Failed to read the profile: {str(e)[:500]}'
+    return profile
+
+
+def _ranked(rows: List[Dict]) -> List[Dict]:
+    rows.sort(key=lambda row: row['self_time'], reverse=True)
+    return rows[:top_n()]
+
+
+def parse_gprof(text: str) -> List[Dict]:
+    """Top functions from the flat profile section of ``gprof -b`` output"""
+    rows = []
+    in_flat_profile = False
+    # Per-call columns are in ms/call, or s/call when calls are long
+    seconds_per_unit = 0.001
+    for line in text.splitlines():
+        if line.startswith('Flat profile'):
+            in_flat_profile = True
+            continue
+        if not in_flat_profile:
+            continue
+        if 'Call graph' in line:
+            break
+        if 'calls' in line and 's/call' in line:
+            seconds_per_unit = 0.001 if 'ms/call' in line else 1.0
+            continue
+        match = GPROF_LINE.match(line)
+        if match:
+            self_time, calls, total_per_call, function = match.groups()
+            rows.append({
+                'function': function.strip(),
+                'calls': int(calls) if calls else None,
+                'self_time': float(self_time),
+                'cumulative_time': int(calls) * float(total_per_call) * seconds_per_unit if calls else None,
+            })
+    return _ranked(rows)
+
+
+def parse_cpuprofile(profile: Dict) -> List[Dict]:
+    """Top functions of a V8 .cpuprofile, attributing each sample's interval"""
+    nodes = {node['id']: node for node in profile['nodes']}
+    parents = {}
+    for node in profile['nodes']:
+        for child in node.get('children', []):
+            parents[child] = node['id']
+
+    def function_of(node):
+        frame = node['callFrame']
+        name = frame['functionName'] or '(anonymous)'
+        if frame.get('url'):
+            name += f' ({os.path.basename(frame["url"])}:{frame["lineNumber"] + 1})'
+        return name
+
+    self_time = defaultdict(float)
+    cumulative_time = defaultdict(float)
+    for node_id, delta in zip(profile.get('samples', []), profile.get('timeDeltas', [])):
+        seconds = max(delta, 0) / 1e6
+        self_time[function_of(nodes[node_id])] += seconds
+        seen = set()
+        while node_id is not None:
+            function = function_of(nodes[node_id])
+            if function not in seen:
+                seen.add(function)
+                cumulative_time[function] += seconds
+            node_id = parents.get(node_id)
+
+    return _ranked([
+        {'function': function, 'calls': None, 'self_time': self_time[function],
+         'cumulative_time': cumulative_time[function]}
+        for function in cumulative_time if function not in ('(root)', '(idle)')
+    ])
+
+
+def parse_jfr(recording: Dict, interval: float = 0.01) -> List[Dict]:
+    """Top methods from ``jfr print --json`` execution samples (10 ms apart)"""
+    self_samples = defaultdict(int)
+    total_samples = defaultdict(int)
+    for event in recording['recording']['events']:
+        frames = (event['values'].get('stackTrace') or {}).get('frames') or []
+        methods = [f'{frame["method"]["type"]["name"]}.{frame["method"]["name"]}' for frame in frames]
+        if not methods:
+            continue
+        self_samples[methods[0]] += 1
+        for method in set(methods):
+            total_samples[method] += 1
+
+    return _ranked([
+        {'function': method, 'calls': None, 'self_time': self_samples[method] * interval,
+         'cumulative_time': samples * interval}
+        for method, samples in total_samples.items()
+    ])
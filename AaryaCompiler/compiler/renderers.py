@@ -0,0 +1,32 @@
+# AaryaOnlineCompiler - API Renderers
+# Created by Aarya Agarwal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson when it is installed.
+    Execution responses can carry large output previews, and orjson encodes
+    them several times faster than the standard library. Falls back to DRF's
+    JSONRenderer when orjson is missing or indented output is requested.
+    """
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        return orjson.dumps(
+            data,
+            default=encoders.JSONEncoder().default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        )
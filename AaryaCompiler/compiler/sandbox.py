@@ -0,0 +1,410 @@
+# AaryaOnlineCompiler - Namespace Sandbox
+# Created by Aarya Agarwal
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import os
+import select
+import shutil
+import subprocess
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional, Union
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Runs inside fresh user/mount/net/pid namespaces (as pid 1 of the new pid
+# namespace). Builds a tmpfs root holding read-only binds of the toolchain
+# paths, /tmp and the writable scratch dir at its host path, then
+# pivots into that root and detaches the host tree, so nothing outside the
+# root stays reachable from the namespace. The parked process waits for EOF
+# on stdin, so the context dies with the worker that owns it.
+HOLDER_SCRIPT = r'''
+set -e
+root=$1; scratch=$2; tmp=$3; shift 3
+mount -t tmpfs -o size=1m,mode=755 sandbox-root "$root"
+for path in "$@"; do
+  [ -e "$path" ] || continue
+  if [ -L "$path" ]; then
+    mkdir -p "$root$(dirname "$path")"
+    ln -s "$(readlink "$path")" "$root$path"
+  else
+    mkdir -p "$root$path"
+    mount --rbind "$path" "$root$path"
+    mount -o remount,bind,ro "$root$path"
+  fi
+done
+mkdir -p "$root/dev" "$root/proc" "$root/tmp" "$root/.host"
+for dev in null zero random urandom; do
+  touch "$root/dev/$dev"
+  mount --bind "/dev/$dev" "$root/dev/$dev"
+done
+mount -t proc proc "$root/proc"
+mount --bind "$tmp" "$root/tmp"
+mkdir -p "$root$scratch"
+mount --bind "$scratch" "$root$scratch"
+cd "$root"
+pivot_root . .host
+umount -l /.host
+rmdir /.host
+mount -o remount,ro,bind /
+echo ready
+exec cat
+'''
+
+# Environment visible to sandboxed programs (nothing from the web worker leaks in)
+SANDBOX_PATH = '/usr/local/bin:/usr/bin:/bin'
+
+
+class SandboxUnavailable(Exception):
+    """Raised when namespaces cannot be created on this host"""
+    pass
+
+
+class SandboxContext:
+    """
+    A pre-built isolation context: a parked process owning user, mount, net
+    and pid namespaces plus a writable scratch directory and /tmp, both
+    host directories so they can be emptied between runs. Runs join the
+    namespaces with nsenter, which costs about as much as one extra exec.
+    """
+
+    def __init__(self, base_dir: str, readonly_paths: List[str]):
+        self.base_dir = base_dir
+        self.root_dir = os.path.join(base_dir, 'root')
+        self.scratch_dir = os.path.join(base_dir, 'scratch')
+        self.tmp_dir = os.path.join(base_dir, 'tmp')
+        self.readonly_paths = readonly_paths
+        self.uses = 0
+        self._holder = None
+        self._ns_pid = None
+
+    def start(self, timeout: float = 5.0):
+        """Create the namespaces and wait until the context is ready"""
+        os.makedirs(self.root_dir, exist_ok=True)
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        os.chmod(self.tmp_dir, 0o1777)
+
+        self._holder = subprocess.Popen(
+            ['unshare', '--user', '--map-root-user', '--mount', '--net', '--pid',
+             '--kill-child', 'sh', '-c', HOLDER_SCRIPT, 'sandbox',
+             self.root_dir, self.scratch_dir, self.tmp_dir, *self.readonly_paths],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
+        ready, _, _ = select.select([self._holder.stdout], [], [], timeout)
+        if not ready or self._holder.stdout.readline().strip() != b'ready':
+            self._holder.kill()
+            _, stderr = self._holder.communicate()
+            stderr = stderr.decode('utf-8', errors='replace').strip()
+            raise SandboxUnavailable(stderr or 'sandbox holder did not become ready')
+
+        children = self._read_children(self._holder.pid)
+        if len(children) != 1:
+            self.terminate()
+            raise SandboxUnavailable('could not find the sandbox init process')
+        self._ns_pid = children[0]
+
+    @staticmethod
+    def _read_children(pid: int) -> List[int]:
+        """Return the pids of a process' direct children"""
+        children = []
+        task_dir = f'/proc/{pid}/task'
+        for tid in os.listdir(task_dir):
+            with open(os.path.join(task_dir, tid, 'children')) as f:
+                children.extend(int(child) for child in f.read().split())
+        return children
+
+    def is_alive(self) -> bool:
+        return self._holder is not None and self._holder.poll() is None
+
+    def is_idle(self) -> bool:
+        """
+        Whether nothing but the namespace's init process is left running.
+        Programs run as children of nsenter, so anything they leave behind is
+        orphaned and reparented to init; a child of init is a leftover (a
+        background process or an unreaped zombie) that could still read the
+        next run's files.
+        """
+        try:
+            return self.is_alive() and not self._read_children(self._ns_pid)
+        except OSError:
+            return False
+
+    def wrap(self, command: List[str], cwd: Optional[str] = None) -> List[str]:
+        """Return ``command`` rewritten to run inside this context"""
+        return [
+            'nsenter', f'--target={self._ns_pid}',
+            '--user', '--mount', '--net', '--pid', '--root',
+            # Resolved after entering the root: --wd would open the directory
+            # on the host and leave the program's cwd outside the sandbox
+            f'--wdns={cwd or self.scratch_dir}',
+            '--', 'env', '-i', f'PATH={SANDBOX_PATH}', 'HOME=/tmp', 'LANG=C.UTF-8',
+            *command
+        ]
+
+    def reset(self):
+        """
+        Empty the scratch directory and /tmp so the next run starts clean
+        and cannot read what the previous one left behind
+        """
+        for directory in (self.scratch_dir, self.tmp_dir):
+            for entry in os.scandir(directory):
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.unlink(entry.path)
+
+    def terminate(self):
+        """
+        Tear the context down. Killing the holder kills the namespace's init
+        process, which takes every process still running inside with it.
+        """
+        if self._holder is not None and self._holder.poll() is None:
+            self._holder.kill()
+            self._holder.wait()
+        if self._holder is not None:
+            self._holder.stdin.close()
+            self._holder.stdout.close()
+            self._holder.stderr.close()
+
+
+class SandboxPool:
+    """
+    Keeps ``size`` isolation contexts prepared ahead of time, and grows up to
+    ``max_size`` while more runs than that are waiting for one.
+    Contexts are recycled after ``max_uses`` runs, when a run had to be
+    killed or left processes behind, and replacements are prepared in the
+    background so a request only pays for nsenter, not for building
+    namespaces and mounts. Threads and event loops wait for contexts in the
+    same first-come queue; an event loop waits without tying up a thread.
+    """
+
+    def __init__(self, base_dir: str, size: int, max_uses: int, readonly_paths: List[str],
+                 max_size: Optional[int] = None):
+        self.base_dir = base_dir
+        self.size = size
+        self.max_size = max(size, max_size or size)
+        self.max_uses = max_uses
+        self.readonly_paths = readonly_paths
+        self._ready = deque()
+        self._waiters = deque()
+        self._contexts = set()
+        self._preparing = 0
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def start(self):
+        """Prepare the first context synchronously (to detect support) and the rest in the background"""
+        self._put(self._create_context())
+        for _ in range(self.size - 1):
+            self._replenish()
+
+    def _create_context(self) -> SandboxContext:
+        with self._lock:
+            self._counter += 1
+            base_dir = os.path.join(self.base_dir, f'{os.getpid()}-{self._counter}')
+        context = SandboxContext(base_dir, self.readonly_paths)
+        context.start()
+        with self._lock:
+            self._contexts.add(context)
+        return context
+
+    def _replenish(self, force: bool = True):
+        """
+        Prepare a context in the background. Unless ``force`` is set, only
+        when the pool is below ``size`` or has more waiters than contexts
+        on the way, and never beyond ``max_size``.
+        """
+        with self._lock:
+            total = len(self._contexts) + self._preparing
+            if not force and total >= self.size and len(self._waiters) <= self._preparing:
+                return
+            if total >= self.max_size:
+                return
+            self._preparing += 1
+
+        def prepare():
+            try:
+                context = self._create_context()
+            except Exception as e:
+                logger.error(f"Failed to prepare sandbox context: {str(e)}")
+                return
+            finally:
+                with self._lock:
+                    self._preparing -= 1
+            self._put(context)
+        threading.Thread(target=prepare, daemon=True).start()
+
+    def _put(self, context: SandboxContext, keep_spare: bool = True) -> bool:
+        """
+        Hand a ready context to the longest waiting caller, or park it.
+        Without ``keep_spare`` a context is not parked when ``size`` are
+        already ready; returns whether the context was taken.
+        """
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                # False when the caller gave up waiting
+                if waiter.set_running_or_notify_cancel():
+                    waiter.set_result(context)
+                    return True
+            if not keep_spare and len(self._ready) >= self.size:
+                return False
+            self._ready.append(context)
+            return True
+
+    def _wait(self) -> Union[SandboxContext, concurrent.futures.Future]:
+        """Take a ready context, or queue up and return the future it will arrive in"""
+        with self._lock:
+            if self._ready:
+                return self._ready.popleft()
+            waiter = concurrent.futures.Future()
+            self._waiters.append(waiter)
+        self._replenish(force=False)
+        return waiter
+
+    def _abandon(self, waiter: concurrent.futures.Future):
+        """Stop waiting; a context handed over in the meantime goes back to the pool"""
+        with self._lock:
+            # Cancelling fails only when _put already completed the handover
+            if waiter.cancel():
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                return
+        self._put(waiter.result())
+
+    def acquire(self, timeout: float) -> SandboxContext:
+        """Take a ready context, waiting up to ``timeout`` seconds for one"""
+        waiter = self._wait()
+        if isinstance(waiter, SandboxContext):
+            return waiter
+        try:
+            return waiter.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self._abandon(waiter)
+            raise SandboxUnavailable('no sandbox context became available in time')
+
+    async def aacquire(self, timeout: float) -> SandboxContext:
+        """Async version of ``acquire``; waits on the event loop instead of a thread"""
+        waiter = self._wait()
+        if isinstance(waiter, SandboxContext):
+            return waiter
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(waiter), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            raise SandboxUnavailable('no sandbox context became available in time')
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def spare(self) -> int:
+        """
+        How many more contexts could be leased without waiting on other
+        runs: ``max_size`` less those in use and those owed to waiters.
+        """
+        with self._lock:
+            in_use = len(self._contexts) - len(self._ready)
+            return max(0, self.max_size - in_use - len(self._waiters))
+
+    def release(self, context: SandboxContext):
+        """
+        Return a context after a run, retiring it if it cannot be reused.
+        Contexts beyond ``size`` that nobody is waiting for are retired too,
+        so the pool shrinks back after a burst.
+        """
+        context.uses += 1
+        if context.uses < self.max_uses and context.is_idle():
+            try:
+                context.reset()
+                if self._put(context, keep_spare=False):
+                    return
+                self._retire(context)
+                return
+            except OSError as e:
+                logger.error(f"Failed to reset sandbox context: {str(e)}")
+        self._retire(context)
+        self._replenish(force=False)
+
+    def _retire(self, context: SandboxContext):
+        context.terminate()
+        shutil.rmtree(context.base_dir, ignore_errors=True)
+        with self._lock:
+            self._contexts.discard(context)
+
+    @contextmanager
+    def lease(self, timeout: float):
+        context = self.acquire(timeout)
+        try:
+            yield context
+        finally:
+            self.release(context)
+
+    @asynccontextmanager
+    async def alease(self, timeout: float):
+        context = await self.aacquire(timeout)
+        try:
+            yield context
+        finally:
+            self.release(context)
+
+    def shutdown(self):
+        with self._lock:
+            contexts = list(self._contexts)
+        for context in contexts:
+            self._retire(context)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pool_failed = False
+
+
+def get_pool() -> Optional[SandboxPool]:
+    """
+    Return this process' sandbox pool, creating it on first use.
+    Returns None when the sandbox is disabled, or when namespaces are not
+    available and the sandbox is not marked as required.
+    """
+    global _pool, _pool_pid, _pool_failed
+
+    config = getattr(settings, 'EXECUTION_SANDBOX', {})
+    if not config.get('ENABLED', False):
+        return None
+
+    with _pool_lock:
+        # Pools are per process: forked workers must not share namespace holders
+        if _pool is not None and _pool_pid == os.getpid():
+            return _pool
+        if _pool_failed and _pool_pid == os.getpid():
+            return None
+
+        _pool_pid = os.getpid()
+        pool = SandboxPool(
+            base_dir=os.path.join(settings.TEMP_FILES_DIR, 'sandbox'),
+            size=config.get('POOL_SIZE', 4),
+            max_size=config.get('MAX_POOL_SIZE', 64),
+            max_uses=config.get('MAX_USES', 50),
+            readonly_paths=config.get('READONLY_PATHS', ['/usr', '/bin', '/lib', '/lib64', '/etc'])
+        )
+        try:
+            pool.start()
+        except (SandboxUnavailable, OSError) as e:
+            if config.get('REQUIRED', False):
+                raise SandboxUnavailable(str(e))
+            logger.warning(f"Namespace sandbox unavailable, running unsandboxed: {str(e)}")
+            _pool_failed = True
+            return None
+
+        _pool = pool
+        atexit.register(pool.shutdown)
+        return _pool
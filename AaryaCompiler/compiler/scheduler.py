@@ -0,0 +1,238 @@
+# AaryaOnlineCompiler - CPU Core Scheduler
+# Created by Aarya Agarwal
+
+import asyncio
+import fcntl
+import itertools
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Iterable, List, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_cpu_list(text: str) -> List[int]:
+    """Parse a kernel CPU list such as "0-3,8,10-11" """
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def available_cores(skip_siblings: bool = False) -> List[int]:
+    """
+    Return the cores this process may run on.
+    With ``skip_siblings`` only the first hardware thread of each physical
+    core is kept, so two pinned runs never share execution units.
+    """
+    cores = sorted(os.sched_getaffinity(0))
+    if not skip_siblings:
+        return cores
+
+    physical = []
+    seen = set()
+    for core in cores:
+        path = f'/sys/devices/system/cpu/cpu{core}/topology/thread_siblings_list'
+        try:
+            with open(path) as f:
+                siblings = tuple(_parse_cpu_list(f.read()))
+        except OSError:
+            siblings = (core,)
+        if siblings not in seen:
+            seen.add(siblings)
+            physical.append(core)
+    return physical
+
+
+def pin_command(command: List[str], cores: Optional[Iterable[int]]) -> List[str]:
+    """
+    Return ``command`` prefixed to run pinned to ``cores`` (unchanged for no
+    pinning). taskset sets the affinity before it execs the command, so
+    every process the command starts inherits it; a preexec_fn would have
+    to run Python between fork and exec, which is unsafe in a threaded
+    server.
+    """
+    if not cores:
+        return command
+    return ['taskset', '--cpu-list', ','.join(str(core) for core in sorted(set(cores))), *command]
+
+
+class CorePool:
+    """
+    A set of cores handed out one run at a time.
+    Leases are flock()s on per-core lock files, so every worker process on
+    the node shares the same pool and a core is never given to two runs.
+    """
+
+    # How often to re-check for a free core while all are busy
+    POLL_INTERVAL = 0.005
+
+    def __init__(self, cores: List[int], lock_dir: str):
+        self.cores = cores
+        self.lock_dir = lock_dir
+        self._start = itertools.cycle(range(len(cores)))
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def _try_lock(self, core: int) -> Optional[int]:
+        fd = os.open(os.path.join(self.lock_dir, f'{core}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def _try_acquire(self, offset: int) -> Optional[Dict]:
+        """Lease the first free core starting at ``offset``, without waiting"""
+        for i in range(len(self.cores)):
+            core = self.cores[(offset + i) % len(self.cores)]
+            fd = self._try_lock(core)
+            if fd is not None:
+                return {'core': core, 'fd': fd}
+        return None
+
+    def acquire(self, timeout: float) -> Optional[Dict]:
+        """
+        Lease a free core, waiting up to ``timeout`` seconds.
+        Returns None if every core stayed busy, in which case the caller runs unpinned.
+        """
+        deadline = time.monotonic() + timeout
+        offset = next(self._start)
+        while True:
+            lease = self._try_acquire(offset)
+            if lease is not None:
+                return lease
+            if time.monotonic() >= deadline:
+                logger.warning("No free core in pool %s, running unpinned", self.cores)
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    async def aacquire(self, timeout: float) -> Optional[Dict]:
+        """Async version of ``acquire``; polls on the event loop instead of blocking a thread"""
+        deadline = time.monotonic() + timeout
+        offset = next(self._start)
+        while True:
+            lease = self._try_acquire(offset)
+            if lease is not None:
+                return lease
+            if time.monotonic() >= deadline:
+                logger.warning("No free core in pool %s, running unpinned", self.cores)
+                return None
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    def release(self, lease: Optional[Dict]):
+        if lease is not None:
+            fcntl.flock(lease['fd'], fcntl.LOCK_UN)
+            os.close(lease['fd'])
+
+    @contextmanager
+    def lease(self, timeout: float):
+        """Context manager yielding a leased core number, or None"""
+        lease = self.acquire(timeout)
+        try:
+            yield lease['core'] if lease else None
+        finally:
+            self.release(lease)
+
+    @asynccontextmanager
+    async def alease(self, timeout: float):
+        lease = await self.aacquire(timeout)
+        try:
+            yield lease['core'] if lease else None
+        finally:
+            self.release(lease)
+
+
+_layout = None
+_layout_lock = threading.Lock()
+_taskset_missing = False
+
+
+def _get_layout() -> Optional[Dict]:
+    """
+    Split the node's cores between compilation and timed runs, or return
+    None when CPU affinity is disabled.
+
+    Unless configured explicitly, the first quarter of the available cores
+    (at least one) is reserved for compilers and the rest are leased one per
+    timed run. When only one of the two sets is configured, the other gets
+    the remaining cores. On a single-core machine both phases share that core.
+    """
+    global _layout, _taskset_missing
+
+    config = getattr(settings, 'EXECUTION_CPU_AFFINITY', {})
+    if not config.get('ENABLED', False):
+        return None
+
+    with _layout_lock:
+        if _taskset_missing:
+            return None
+        if _layout is None:
+            if shutil.which('taskset') is None:
+                logger.warning("taskset (util-linux) not found, running unpinned")
+                _taskset_missing = True
+                return None
+            cores = available_cores(config.get('SKIP_HYPERTHREAD_SIBLINGS', True))
+            compile_count = max(1, len(cores) // 4)
+            run_cores = config.get('RUN_CORES')
+            compile_cores = (
+                config.get('COMPILE_CORES')
+                or (run_cores and [core for core in cores if core not in run_cores])
+                or cores[:compile_count]
+            )
+            run_cores = run_cores or [core for core in cores if core not in compile_cores] or cores
+            _layout = {
+                'compile_cores': list(compile_cores),
+                'run_pool': CorePool(list(run_cores), os.path.join(settings.TEMP_FILES_DIR, 'cores')),
+                'acquire_timeout': config.get('ACQUIRE_TIMEOUT', 10),
+            }
+        return _layout
+
+
+def compile_cores() -> Optional[List[int]]:
+    """Cores compilers are confined to, or None when affinity is disabled"""
+    layout = _get_layout()
+    return layout['compile_cores'] if layout else None
+
+
+@contextmanager
+def run_core():
+    """
+    Lease a dedicated core for a timed run.
+    Yields the core number, or None when affinity is disabled or no core
+    became free within the configured ACQUIRE_TIMEOUT.
+    """
+    layout = _get_layout()
+    if layout is None:
+        yield None
+        return
+    with layout['run_pool'].lease(layout['acquire_timeout']) as core:
+        yield core
+
+
+@asynccontextmanager
+async def arun_core():
+    """Async version of ``run_core``; waiting for a core does not hold a thread"""
+    layout = _get_layout()
+    if layout is None:
+        yield None
+        return
+    async with layout['run_pool'].alease(layout['acquire_timeout']) as core:
+        yield core
+
+
+def run_core_count() -> Optional[int]:
+    """Number of cores in the run pool, or None when affinity is disabled"""
+    layout = _get_layout()
+    return len(layout['run_pool'].cores) if layout else None
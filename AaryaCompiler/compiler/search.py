@@ -0,0 +1,179 @@
+# AaryaOnlineCompiler - Execution Search
+# Created by Aarya Agarwal
+
+import uuid
+from typing import Iterable, List, Optional, Union
+from django.db import connection, transaction
+
+# Searched text columns, used for LIKE scans on backends without a full-text index
+SEARCH_FIELDS = ['source_code', 'output', 'error_output']
+
+# PostgreSQL document of one execution. tsvectors are capped at 1 MB, so only
+# the head of each column is indexed
+POSTGRESQL_DOCUMENT = """
+    to_tsvector('simple', left(source_code, 262144)) ||
+    to_tsvector('simple', left(output, 131072)) ||
+    to_tsvector('simple', left(error_output, 131072))
+"""
+
+
+def is_supported() -> bool:
+    """Check if the current database has a full-text index for executions"""
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _fts5_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query matching all of its terms.
+    Every term is quoted, so operators and punctuation in code
+    (``a.b()``, ``-x``, ``"s"``) are matched literally instead of parsed.
+    """
+    terms = query.split()
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _db_id(execution_id: Union[uuid.UUID, str]):
+    """An execution id as stored in the database (SQLite keeps UUIDs as hex)"""
+    execution_id = execution_id if isinstance(execution_id, uuid.UUID) else uuid.UUID(execution_id)
+    return execution_id.hex if connection.vendor == 'sqlite' else execution_id
+
+
+def _index_sqlite(cursor, ids: Iterable):
+    """(Re)index executions in the FTS5 table under their mapped document ids"""
+    for execution_id in ids:
+        cursor.execute(
+            "INSERT OR IGNORE INTO compiler_codeexecution_search (execution_id) VALUES (%s)",
+            [execution_id]
+        )
+        cursor.execute(
+            "SELECT docid FROM compiler_codeexecution_search WHERE execution_id = %s",
+            [execution_id]
+        )
+        docid = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM compiler_codeexecution_fts WHERE rowid = %s", [docid])
+        cursor.execute(
+            """
+            INSERT INTO compiler_codeexecution_fts (rowid, source_code, output, error_output)
+            SELECT %s, source_code, output, error_output FROM compiler_codeexecution WHERE id = %s
+            """,
+            [docid, execution_id]
+        )
+
+
+def _index_postgresql(cursor, ids: List):
+    cursor.execute(
+        f"""
+        INSERT INTO compiler_codeexecution_search (execution_id, document)
+        SELECT id, {POSTGRESQL_DOCUMENT}
+        FROM compiler_codeexecution
+        WHERE id = ANY(%s)
+        ON CONFLICT (execution_id) DO UPDATE SET document = EXCLUDED.document
+        """,
+        [ids]
+    )
+
+
+def index_execution(execution_id: Union[uuid.UUID, str]):
+    """
+    Add a completed execution to the full-text index, replacing any earlier
+    entry. Called once when an execution completes, so saves before that
+    (status updates while it runs) never touch the index.
+    """
+    if not is_supported():
+        return
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            _index_sqlite(cursor, [_db_id(execution_id)])
+        else:
+            _index_postgresql(cursor, [_db_id(execution_id)])
+
+
+def search_execution_ids(query: str, limit: int = 100) -> Optional[List[uuid.UUID]]:
+    """
+    Return ids of executions matching every term of ``query``, best matches
+    first. Returns None when the database has no full-text index, so the
+    caller can fall back to a LIKE scan.
+    """
+    if not is_supported():
+        return None
+    if not query.split():
+        return []
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                """
+                SELECT s.execution_id FROM compiler_codeexecution_fts
+                JOIN compiler_codeexecution_search s ON s.docid = compiler_codeexecution_fts.rowid
+                WHERE compiler_codeexecution_fts MATCH %s
+                ORDER BY rank
+                LIMIT %s
+                """,
+                [_fts5_query(query), limit]
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT execution_id FROM compiler_codeexecution_search
+                WHERE document @@ plainto_tsquery('simple', %s)
+                ORDER BY ts_rank(document, plainto_tsquery('simple', %s)) DESC
+                LIMIT %s
+                """,
+                [query, query, limit]
+            )
+        rows = cursor.fetchall()
+
+    return [row[0] if isinstance(row[0], uuid.UUID) else uuid.UUID(row[0]) for row in rows]
+
+
+def rebuild_index(batch_size: int = 1000, stdout=None) -> int:
+    """
+    (Re)index every completed execution, e.g. rows that existed before the
+    index was created. Returns the number of rows processed.
+    """
+    if not is_supported():
+        return 0
+
+    processed = 0
+    last_id = None
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # Start from an empty index so documents of deleted executions go too
+            cursor.execute("DELETE FROM compiler_codeexecution_search")
+            cursor.execute("DELETE FROM compiler_codeexecution_fts")
+
+        while True:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    """
+                    SELECT id FROM compiler_codeexecution
+                    WHERE completed_at IS NOT NULL AND (%s IS NULL OR id > %s)
+                    ORDER BY id
+                    LIMIT %s
+                    """,
+                    [last_id, last_id, batch_size]
+                )
+            else:
+                cursor.execute(
+                    """
+                    SELECT id FROM compiler_codeexecution
+                    WHERE completed_at IS NOT NULL AND (%s::uuid IS NULL OR id > %s::uuid)
+                    ORDER BY id
+                    LIMIT %s
+                    """,
+                    [last_id, last_id, batch_size]
+                )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return processed
+
+            with transaction.atomic():
+                if connection.vendor == 'sqlite':
+                    _index_sqlite(cursor, ids)
+                else:
+                    _index_postgresql(cursor, ids)
+            processed += len(ids)
+            last_id = ids[-1]
+            if stdout is not None:
+                stdout.write(f'Indexed {processed} executions')
@@ -2,7 +2,9 @@
 # Created by Aarya Agarwal
 
 from rest_framework import serializers
-from .models import CodeExecution
+from .models import CodeExecution, StressTest
+from .uploads import max_input_size
+from . import profiling, toolchain
 
 class CodeExecutionSerializer(serializers.ModelSerializer):
     """
@@ -13,19 +15,21 @@ class CodeExecutionSerializer(serializers.ModelSerializer):
     class Meta:
         model = CodeExecution
         fields = [
-            'id', 'language', 'source_code', 'input_data', 
-            'output', 'error_output', 'status', 'execution_time', 
-            'memory_used', 'created_at', 'completed_at'
+            'id', 'language', 'source_code', 'input_data', 'input_size', 'input_sha256',
+            'output', 'error_output', 'output_size', 'error_output_size',
+            'status', 'execution_time', 'run_time', 'normalized_run_time', 'time_limit',
+            'memory_used', 'assigned_core', 'coalesced_from', 'created_at', 'completed_at'
         ]
         read_only_fields = [
-            'id', 'output', 'error_output', 'status', 'execution_time',
-            'memory_used', 'created_at', 'completed_at'
+            'id', 'input_size', 'input_sha256', 'output', 'error_output', 'output_size', 'error_output_size',
+            'status', 'execution_time', 'run_time', 'normalized_run_time', 'time_limit',
+            'memory_used', 'assigned_core', 'coalesced_from', 'created_at', 'completed_at'
         ]
 
-class ExecuteCodeRequestSerializer(serializers.Serializer):
+class ProgramSerializer(serializers.Serializer):
     """
-    Serializer for code execution requests.
-    Validates incoming code execution requests from the frontend.
+    Serializer for a single program (language and source code).
+    Shared by code execution and stress-test requests.
     """
     language = serializers.ChoiceField(
         choices=CodeExecution.LANGUAGE_CHOICES,
@@ -36,12 +40,6 @@ class ExecuteCodeRequestSerializer(serializers.Serializer):
         min_length=1,
         help_text="Source code to be compiled and executed"
     )
-    input_data = serializers.CharField(
-        required=False,
-        allow_blank=True,
-        default="",
-        help_text="Input data to be passed to the program during execution"
-    )
     
     def validate_source_code(self, value):
         """
@@ -61,6 +59,60 @@ class ExecuteCodeRequestSerializer(serializers.Serializer):
         
         return value
 
+class ExecuteCodeRequestSerializer(ProgramSerializer):
+    """
+    Serializer for code execution requests.
+    Validates incoming code execution requests from the frontend.
+    """
+    input_data = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        default="",
+        help_text="Input data to be passed to the program during execution"
+    )
+    input_file = serializers.FileField(
+        required=False,
+        allow_empty_file=True,
+        help_text="Input file streamed to the program's stdin (multipart uploads); "
+                  "use instead of input_data for large inputs"
+    )
+    coalesce = serializers.BooleanField(
+        required=False,
+        default=True,
+        help_text="Share the run with an identical submission already in flight; "
+                  "set to false to always get an independent run"
+    )
+    profile = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Run under the language's profiler and return the top functions by self time"
+    )
+    
+    def validate_input_data(self, value):
+        if len(value.encode('utf-8')) > max_input_size():
+            raise serializers.ValidationError(
+                f"Input data exceeds the {max_input_size()} byte limit"
+            )
+        return value
+    
+    def validate_profile(self, value):
+        if value and not profiling.is_enabled():
+            raise serializers.ValidationError("Profiling is disabled on this server")
+        return value
+    
+    def validate(self, attrs):
+        if attrs.get('input_file') is not None and attrs.get('input_data'):
+            raise serializers.ValidationError("Send either input_data or input_file, not both")
+        if attrs.get('profile'):
+            missing = toolchain.missing_profiler_tools(attrs['language'])
+            if missing:
+                raise serializers.ValidationError({
+                    'profile': f"Profiling {attrs['language']} needs {', '.join(missing)}, "
+                               f"which this server does not have"
+                })
+        return attrs
+
+
 class ExecuteCodeResponseSerializer(serializers.Serializer):
     """
     Serializer for code execution responses.
@@ -70,6 +122,67 @@ class ExecuteCodeResponseSerializer(serializers.Serializer):
     status = serializers.CharField(read_only=True)
     output = serializers.CharField(read_only=True)
     error_output = serializers.CharField(read_only=True)
+    output_size = serializers.IntegerField(read_only=True)
+    error_output_size = serializers.IntegerField(read_only=True)
+    input_size = serializers.IntegerField(read_only=True)
+    input_sha256 = serializers.CharField(read_only=True)
+    output_truncated = serializers.BooleanField(read_only=True)
+    error_output_truncated = serializers.BooleanField(read_only=True)
     execution_time = serializers.FloatField(read_only=True)
+    run_time = serializers.FloatField(read_only=True, allow_null=True)
+    normalized_run_time = serializers.FloatField(read_only=True, allow_null=True)
+    time_limit = serializers.FloatField(read_only=True, allow_null=True)
     memory_used = serializers.IntegerField(read_only=True)
+    assigned_core = serializers.IntegerField(read_only=True, allow_null=True)
+    coalesced = serializers.BooleanField(read_only=True)
+    coalesced_from = serializers.UUIDField(read_only=True, allow_null=True)
+    profile = serializers.DictField(
+        read_only=True,
+        allow_null=True,
+        help_text="Profile report (format, top functions, download URL) for profiled runs"
+    )
+    note = serializers.CharField(read_only=True, required=False)
     message = serializers.CharField(read_only=True)
+
+class StressTestRequestSerializer(serializers.Serializer):
+    """
+    Serializer for stress-test requests.
+    Takes a generator, a reference brute-force solution and the candidate
+    solution, plus how many seeds to try.
+    """
+    generator = ProgramSerializer(help_text="Prints a random input for the seed given as its first argument")
+    brute = ProgramSerializer(help_text="Reference solution trusted to be correct")
+    solution = ProgramSerializer(help_text="Candidate solution under test")
+    iterations = serializers.IntegerField(
+        min_value=1,
+        default=100,
+        help_text="Number of seeds to try"
+    )
+    start_seed = serializers.IntegerField(
+        default=1,
+        help_text="First seed passed to the generator"
+    )
+    
+    def validate_iterations(self, value):
+        from .services import StressTestService
+        if value > StressTestService.MAX_ITERATIONS:
+            raise serializers.ValidationError(
+                f"At most {StressTestService.MAX_ITERATIONS} iterations are allowed"
+            )
+        return value
+
+class StressTestSerializer(serializers.ModelSerializer):
+    """
+    Serializer for StressTest results.
+    """
+    iterations_per_second = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = StressTest
+        fields = [
+            'id', 'status', 'verdict', 'iterations', 'start_seed', 'iterations_run',
+            'iterations_per_second', 'failing_seed', 'failing_input',
+            'expected_output', 'actual_output', 'error_output', 'elapsed_time',
+            'created_at', 'completed_at'
+        ]
+        read_only_fields = fields
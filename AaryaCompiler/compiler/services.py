@@ -1,14 +1,25 @@
 # AaryaOnlineCompiler - Code Execution Services
 # Created by Aarya Agarwal
 
+import asyncio
 import os
+import re
+import shutil
 import subprocess
 import tempfile
+import threading
 import time
-import signal
-from typing import Dict, Tuple, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from .models import CodeExecution
+from django.utils import timezone
+from .models import CodeExecution, StressTest
+from .coalescing import Coalescer, get_coalescer
+from .sandbox import SandboxContext, get_pool
+from .uploads import file_digest, text_digest
+from . import calibration, profiling, scheduler, toolchain
 
 class TimeoutException(Exception):
     """Custom exception for execution timeout"""
@@ -18,255 +29,885 @@ class CodeExecutionService:
     """
     Service class for executing code in different programming languages.
     Handles compilation, execution, and cleanup of temporary files.
+
+    Every language is described by a compile/run plan (see ``_prepare_program``)
+    which is then carried out either synchronously with ``subprocess.run`` or
+    asynchronously with asyncio subprocesses, so both paths behave the same.
     """
-    
-    # Execution timeout in seconds
+
+    # Execution timeout in seconds; run limits scale this per language and
+    # node when calibration is enabled (see calibration.get_limits)
     EXECUTION_TIMEOUT = 10
+
+    # Maximum output size kept per stream in bytes (16 MB, stored compressed)
+    MAX_OUTPUT_SIZE = 16 * 1024 * 1024
     
-    # Maximum output size in bytes (1 MB)
-    MAX_OUTPUT_SIZE = 1024 * 1024
-    
-    @staticmethod
-    def timeout_handler(signum, frame):
-        """Signal handler for execution timeout"""
-        raise TimeoutException("Code execution timed out")
-    
+    # Size of the inline output preview returned with results (64 KB)
+    OUTPUT_PREVIEW_SIZE = 64 * 1024
+
     @classmethod
-    def execute_code(cls, execution: CodeExecution) -> Dict:
+    def execute_code(cls, execution: CodeExecution, coalesce: bool = True,
+                     input_file: Optional[str] = None, profile: bool = False) -> Dict:
         """
         Main method to execute code based on the programming language.
-        
+
         Args:
             execution: CodeExecution instance containing the code to execute
-            
+            coalesce: share the run with identical submissions already in flight
+            input_file: path of an uploaded input file streamed to the program's
+                stdin instead of ``execution.input_data``
+            profile: run under the language's profiler and store a hotspot
+                report (profiled runs are never coalesced)
+
         Returns:
             Dict containing execution results
         """
+        limits = calibration.get_limits(execution.language, cls.EXECUTION_TIMEOUT)
+        execution.time_limit = limits['time_limit']
         execution.status = 'running'
+        # A profiled run is slower and produces its own profile, so it is never shared
+        coalesce = coalesce and not profile
+        cls._digest_input(execution, input_file)
         execution.save()
-        
+
         start_time = time.time()
-        
+
         try:
-            if execution.language == 'cpp':
-                result = cls._execute_cpp(execution.source_code, execution.input_data)
-            elif execution.language == 'python':
-                result = cls._execute_python(execution.source_code, execution.input_data)
-            elif execution.language == 'java':
-                result = cls._execute_java(execution.source_code, execution.input_data)
-            elif execution.language == 'javascript':
-                result = cls._execute_javascript(execution.source_code, execution.input_data)
-            else:
-                result = {
-                    'success': False,
-                    'output': '',
-                    'error': f'Unsupported language: {execution.language}',
-                    'execution_time': 0
-                }
-            
-            execution_time = time.time() - start_time
-            execution.execution_time = execution_time
-            execution.output = result['output']
-            execution.error_output = result['error']
-            execution.status = 'completed' if result['success'] else 'error'
-            
+            result = cls._execute_coalesced(execution, coalesce, input_file, profile)
+            cls._record_result(execution, result, start_time, limits['speed_factor'])
         except TimeoutException:
-            execution.status = 'timeout'
-            execution.error_output = f'Code execution timed out after {cls.EXECUTION_TIMEOUT} seconds'
-            result = {
-                'success': False,
-                'output': '',
-                'error': execution.error_output,
-                'execution_time': cls.EXECUTION_TIMEOUT
-            }
+            result = cls._record_timeout(execution)
         except Exception as e:
-            execution.status = 'error'
-            execution.error_output = f'Unexpected error: {str(e)}'
-            result = {
-                'success': False,
-                'output': '',
-                'error': execution.error_output,
-                'execution_time': time.time() - start_time
-            }
-        
+            result = cls._record_error(execution, e, start_time)
+
         execution.mark_completed()
         return result
-    
+
     @classmethod
-    def _execute_cpp(cls, source_code: str, input_data: str = "") -> Dict:
-        """Execute C++ code"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Write source code to file
-            source_file = os.path.join(temp_dir, 'main.cpp')
-            executable_file = os.path.join(temp_dir, 'main')
-            
-            with open(source_file, 'w') as f:
-                f.write(source_code)
-            
-            # Compile
+    async def aexecute_code(cls, execution: CodeExecution, coalesce: bool = True,
+                            input_file: Optional[str] = None, profile: bool = False) -> Dict:
+        """
+        Asynchronous counterpart of ``execute_code``.
+
+        Uses asyncio subprocesses and the async ORM so that a single ASGI
+        worker can supervise many running programs without a thread each.
+        """
+        limits = await sync_to_async(calibration.get_limits)(execution.language, cls.EXECUTION_TIMEOUT)
+        execution.time_limit = limits['time_limit']
+        execution.status = 'running'
+        # A profiled run is slower and produces its own profile, so it is never shared
+        coalesce = coalesce and not profile
+        await asyncio.to_thread(cls._digest_input, execution, input_file)
+        await execution.asave()
+
+        start_time = time.time()
+
+        try:
+            result = await cls._aexecute_coalesced(execution, coalesce, input_file, profile)
+            cls._record_result(execution, result, start_time, limits['speed_factor'])
+        except TimeoutException:
+            result = cls._record_timeout(execution)
+        except asyncio.CancelledError:
+            # The program has been killed (see _arun_process); close the
+            # record instead of leaving it running forever
+            cls._record_cancelled(execution, start_time)
+            await asyncio.shield(execution.amark_completed())
+            raise
+        except Exception as e:
+            result = cls._record_error(execution, e, start_time)
+
+        await execution.amark_completed()
+        return result
+
+    @classmethod
+    def _execute_coalesced(cls, execution: CodeExecution, coalesce: bool,
+                           input_file: Optional[str] = None, profile: bool = False) -> Dict:
+        """
+        Run the execution's program, sharing one run between identical
+        submissions (same language, source and input) that are in flight on
+        this node at the same time. Followers get the leader's result and
+        ``execution.coalesced_from`` is set to the leader's id.
+        """
+        coalescer = get_coalescer() if coalesce else None
+        if coalescer is None:
+            return cls._execute_program(
+                execution.language, execution.source_code, execution.input_data,
+                input_file, execution.time_limit, profile
+            )
+
+        def work():
             try:
-                compile_process = subprocess.run(
-                    ['g++', '-o', executable_file, source_file, '-std=c++17'],
-                    capture_output=True,
-                    text=True,
-                    timeout=cls.EXECUTION_TIMEOUT
-                )
-                
-                if compile_process.returncode != 0:
-                    return {
-                        'success': False,
-                        'output': '',
-                        'error': f'Compilation Error:\\n{compile_process.stderr}',
-                        'execution_time': 0
-                    }
-                
-                # Execute
-                return cls._run_executable(executable_file, input_data)
-                
-            except subprocess.TimeoutExpired:
-                raise TimeoutException("Compilation timed out")
-    
+                return {'result': cls._execute_program(
+                    execution.language, execution.source_code, execution.input_data,
+                    input_file, execution.time_limit, profile
+                )}
+            except TimeoutException:
+                return {'timeout': True}
+
+        outcome, leader_id = coalescer.run(cls._coalescing_key(execution), str(execution.id), work)
+        return cls._unpack_outcome(execution, outcome, leader_id)
+
     @classmethod
-    def _execute_python(cls, source_code: str, input_data: str = "") -> Dict:
-        """Execute Python code"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            source_file = os.path.join(temp_dir, 'main.py')
-            
-            with open(source_file, 'w') as f:
-                f.write(source_code)
-            
+    async def _aexecute_coalesced(cls, execution: CodeExecution, coalesce: bool,
+                                  input_file: Optional[str] = None, profile: bool = False) -> Dict:
+        """Async version of ``_execute_coalesced``"""
+        coalescer = get_coalescer() if coalesce else None
+        if coalescer is None:
+            return await cls._aexecute_program(
+                execution.language, execution.source_code, execution.input_data,
+                input_file, execution.time_limit, profile
+            )
+
+        async def work():
             try:
-                # Set up signal handler for timeout
-                signal.signal(signal.SIGALRM, cls.timeout_handler)
-                signal.alarm(cls.EXECUTION_TIMEOUT)
-                
-                process = subprocess.run(
-                    ['python3', source_file],
-                    input=input_data,
-                    capture_output=True,
-                    text=True,
-                    timeout=cls.EXECUTION_TIMEOUT
-                )
-                
-                signal.alarm(0)  # Cancel alarm
-                
-                return {
-                    'success': process.returncode == 0,
-                    'output': cls._truncate_output(process.stdout),
-                    'error': cls._truncate_output(process.stderr) if process.returncode != 0 else '',
-                    'execution_time': 0  # We could implement better timing here
-                }
-                
-            except subprocess.TimeoutExpired:
-                signal.alarm(0)
-                raise TimeoutException("Python execution timed out")
-    
+                return {'result': await cls._aexecute_program(
+                    execution.language, execution.source_code, execution.input_data,
+                    input_file, execution.time_limit, profile
+                )}
+            except TimeoutException:
+                return {'timeout': True}
+
+        outcome, leader_id = await coalescer.arun(cls._coalescing_key(execution), str(execution.id), work)
+        return cls._unpack_outcome(execution, outcome, leader_id)
+
+    @staticmethod
+    def _digest_input(execution: CodeExecution, input_file: Optional[str] = None) -> None:
+        """
+        Record the size and hash of the program input, which identify it for
+        coalescing. Inline input is always hashed here instead of trusting
+        the caller; an uploaded file is only read back when the caller did
+        not hash it while receiving it (see InputUploadHandler).
+        """
+        if input_file is None:
+            execution.input_size, execution.input_sha256 = text_digest(execution.input_data)
+        elif not execution.input_sha256:
+            execution.input_size, execution.input_sha256 = file_digest(input_file)
+
+    @staticmethod
+    def _coalescing_key(execution: CodeExecution) -> str:
+        # Inputs are identified by their hash, so uploaded files are never read back
+        return Coalescer.key(execution.language, execution.source_code, execution.input_sha256)
+
+    @staticmethod
+    def _unpack_outcome(execution: CodeExecution, outcome: Dict, leader_id: Optional[str]) -> Dict:
+        """Turn a (possibly shared) outcome back into a result or a timeout"""
+        execution.coalesced_from = leader_id
+        if outcome.get('timeout'):
+            raise TimeoutException("Code execution timed out")
+        return outcome['result']
+
+    @classmethod
+    def _record_result(cls, execution: CodeExecution, result: Dict, start_time: float,
+                       speed_factor: float = 1.0) -> None:
+        """Copy a finished run's result onto the execution record"""
+        execution.execution_time = time.time() - start_time
+        execution.run_time = result.get('run_time')
+        execution.normalized_run_time = calibration.normalize(execution.run_time, speed_factor)
+        execution.assigned_core = result.get('assigned_core')
+        if result.get('profile') is not None:
+            execution.store_profile(result['profile'], cls.MAX_OUTPUT_SIZE)
+        if result.get('timed_out'):
+            cls._record_timeout(execution)
+            return
+        cls._store_outputs(execution, result['output'], result['error'])
+        execution.status = 'completed' if result['success'] else 'error'
+
+    @classmethod
+    def _record_timeout(cls, execution: CodeExecution) -> Dict:
+        """Mark the execution as timed out and return the matching result"""
+        time_limit = execution.time_limit or cls.EXECUTION_TIMEOUT
+        execution.status = 'timeout'
+        cls._store_outputs(execution, '', f'Code execution timed out after {time_limit:g} seconds')
+        return {
+            'success': False,
+            'output': '',
+            'error': execution.error_output,
+            'execution_time': time_limit
+        }
+
+    @classmethod
+    def _record_error(cls, execution: CodeExecution, error: Exception, start_time: float) -> Dict:
+        """Mark the execution as failed with an unexpected error"""
+        execution.status = 'error'
+        cls._store_outputs(execution, '', f'Unexpected error: {str(error)}')
+        return {
+            'success': False,
+            'output': '',
+            'error': execution.error_output,
+            'execution_time': time.time() - start_time
+        }
+
     @classmethod
-    def _execute_java(cls, source_code: str, input_data: str = "") -> Dict:
-        """Execute Java code"""
-        with tempfile.TemporaryDirectory() as temp_dir:
+    def _record_cancelled(cls, execution: CodeExecution, start_time: float) -> None:
+        """Mark the execution as stopped because its request was cancelled"""
+        execution.status = 'error'
+        execution.execution_time = time.time() - start_time
+        cls._store_outputs(execution, '', 'Code execution was cancelled: the request was aborted')
+
+    @classmethod
+    def _store_outputs(cls, execution: CodeExecution, output: str, error_output: str) -> None:
+        """Store both output streams as previews with compressed full copies"""
+        execution.store_output('output', output, cls.OUTPUT_PREVIEW_SIZE)
+        execution.store_output('error_output', error_output, cls.OUTPUT_PREVIEW_SIZE)
+
+    @classmethod
+    def _prepare_program(cls, language: str, source_code: str, temp_dir: str) -> Optional[Dict]:
+        """
+        Write the source into ``temp_dir`` and describe how to build and run it.
+
+        Returns a dict with the ``compile`` command (or None for interpreted
+        languages), the ``run`` command and the working directory, or None if
+        the language is not supported.
+        """
+        if language == 'cpp':
+            source_file = os.path.join(temp_dir, 'main.cpp')
+            executable_file = os.path.join(temp_dir, 'main')
+            compile_command = [toolchain.resolve('g++'), '-o', executable_file, source_file, '-std=c++17']
+            run_command = [executable_file]
+        elif language == 'python':
+            source_file = os.path.join(temp_dir, 'main.py')
+            compile_command = None
+            run_command = [toolchain.resolve('python3'), source_file]
+        elif language == 'java':
             # Extract class name from source code (basic implementation)
-            import re
-            class_match = re.search(r'public\\s+class\\s+(\\w+)', source_code)
+            class_match = re.search(r'public\s+class\s+(\w+)', source_code)
             class_name = class_match.group(1) if class_match else 'Main'
-            
             source_file = os.path.join(temp_dir, f'{class_name}.java')
-            
-            with open(source_file, 'w') as f:
-                f.write(source_code)
-            
-            try:
-                # Compile
-                compile_process = subprocess.run(
-                    ['javac', source_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=cls.EXECUTION_TIMEOUT,
-                    cwd=temp_dir
+            compile_command = [toolchain.resolve('javac'), source_file]
+            run_command = [toolchain.resolve('java'), class_name]
+        elif language == 'javascript':
+            source_file = os.path.join(temp_dir, 'main.js')
+            compile_command = None
+            run_command = [toolchain.resolve('node'), source_file]
+        else:
+            return None
+
+        with open(source_file, 'w') as f:
+            f.write(source_code)
+
+        return {
+            'compile': compile_command,
+            'run': run_command,
+            'cwd': temp_dir,
+        }
+
+    @classmethod
+    @contextmanager
+    def _workspace(cls):
+        """
+        Provide a directory to build and run a program in.
+        Yields ``(directory, sandbox)``: a pre-warmed namespace sandbox and its
+        scratch dir when the sandbox is enabled, otherwise a plain temporary
+        directory and None.
+        """
+        pool = get_pool()
+        if pool is None:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                yield temp_dir, None
+            return
+
+        with pool.lease(cls.EXECUTION_TIMEOUT) as context:
+            yield context.scratch_dir, context
+
+    @classmethod
+    @asynccontextmanager
+    async def _aworkspace(cls):
+        """Async version of ``_workspace``; waiting for a context does not hold a thread"""
+        pool = await asyncio.to_thread(get_pool)
+        if pool is None:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                yield temp_dir, None
+            return
+
+        async with pool.alease(cls.EXECUTION_TIMEOUT) as context:
+            yield context.scratch_dir, context
+
+    @classmethod
+    def _execute_program(cls, language: str, source_code: str, input_data: str = "",
+                         input_file: Optional[str] = None,
+                         time_limit: Optional[float] = None,
+                         profile: bool = False) -> Dict:
+        """
+        Compile (if needed) and run a program synchronously.
+        The run is limited to ``time_limit`` seconds (EXECUTION_TIMEOUT by
+        default) and timed on its own as ``run_time`` in the result. With
+        ``profile`` the result also carries the profile and whether the
+        program was stopped at its limit (``timed_out``).
+        """
+        with cls._workspace() as (temp_dir, sandbox):
+            missing = toolchain.missing_tools(language)
+            if missing:
+                return cls._missing_toolchain_result(missing)
+
+            program = cls._prepare_program(language, source_code, temp_dir)
+            if program is None:
+                return cls._unsupported_result(language)
+
+            run_limit = time_limit or cls.EXECUTION_TIMEOUT
+            if profile:
+                program = profiling.instrument(language, program, run_limit)
+                run_limit += profiling.DUMP_GRACE
+
+            if program['compile']:
+                returncode, _, stderr = cls._run_process(
+                    program['compile'], cwd=program['cwd'], sandbox=sandbox,
+                    cores=scheduler.compile_cores()
                 )
-                
-                if compile_process.returncode != 0:
-                    return {
-                        'success': False,
-                        'output': '',
-                        'error': f'Compilation Error:\\n{compile_process.stderr}',
-                        'execution_time': 0
-                    }
-                
-                # Execute
-                process = subprocess.run(
-                    ['java', class_name],
-                    input=input_data,
-                    capture_output=True,
-                    text=True,
-                    timeout=cls.EXECUTION_TIMEOUT,
-                    cwd=temp_dir
+                if returncode != 0:
+                    return cls._compilation_error_result(stderr)
+
+            with scheduler.run_core() as core:
+                run_start = time.perf_counter()
+                try:
+                    returncode, stdout, stderr = cls._run_process(
+                        program['run'], input_data, cwd=program['cwd'], sandbox=sandbox,
+                        cores=[core] if core is not None else None, input_file=input_file,
+                        timeout=run_limit
+                    )
+                except TimeoutException:
+                    if not profile:
+                        raise
+                    # Ignored the limit signal too; report the timeout without a profile
+                    returncode, stdout, stderr = profiling.LIMIT_EXIT_STATUS, '', ''
+                run_time = time.perf_counter() - run_start
+            result = cls._build_result(returncode, stdout, stderr)
+            result['assigned_core'] = core
+            result['run_time'] = run_time
+            if profile:
+                result['timed_out'] = profiling.hit_limit(returncode)
+                result['profile'] = profiling.collect(language, program, sandbox)
+            return result
+
+    @classmethod
+    async def _aexecute_program(cls, language: str, source_code: str, input_data: str = "",
+                                input_file: Optional[str] = None,
+                                time_limit: Optional[float] = None,
+                                profile: bool = False) -> Dict:
+        """Compile (if needed) and run a program on the event loop"""
+        async with cls._aworkspace() as (temp_dir, sandbox):
+            missing = toolchain.missing_tools(language)
+            if missing:
+                return cls._missing_toolchain_result(missing)
+
+            program = cls._prepare_program(language, source_code, temp_dir)
+            if program is None:
+                return cls._unsupported_result(language)
+
+            run_limit = time_limit or cls.EXECUTION_TIMEOUT
+            if profile:
+                program = profiling.instrument(language, program, run_limit)
+                run_limit += profiling.DUMP_GRACE
+
+            if program['compile']:
+                returncode, _, stderr = await cls._arun_process(
+                    program['compile'], cwd=program['cwd'], sandbox=sandbox,
+                    cores=scheduler.compile_cores()
                 )
-                
-                return {
-                    'success': process.returncode == 0,
-                    'output': cls._truncate_output(process.stdout),
-                    'error': cls._truncate_output(process.stderr) if process.returncode != 0 else '',
-                    'execution_time': 0
-                }
-                
+                if returncode != 0:
+                    return cls._compilation_error_result(stderr)
+
+            async with scheduler.arun_core() as core:
+                run_start = time.perf_counter()
+                try:
+                    returncode, stdout, stderr = await cls._arun_process(
+                        program['run'], input_data, cwd=program['cwd'], sandbox=sandbox,
+                        cores=[core] if core is not None else None, input_file=input_file,
+                        timeout=run_limit
+                    )
+                except TimeoutException:
+                    if not profile:
+                        raise
+                    returncode, stdout, stderr = profiling.LIMIT_EXIT_STATUS, '', ''
+                run_time = time.perf_counter() - run_start
+            result = cls._build_result(returncode, stdout, stderr)
+            result['assigned_core'] = core
+            result['run_time'] = run_time
+            if profile:
+                result['timed_out'] = profiling.hit_limit(returncode)
+                result['profile'] = await asyncio.to_thread(profiling.collect, language, program, sandbox)
+            return result
+
+    @classmethod
+    def _run_process(cls, command: List[str], input_data: Optional[str] = None,
+                     cwd: Optional[str] = None,
+                     sandbox: Optional[SandboxContext] = None,
+                     cores: Optional[List[int]] = None,
+                     input_file: Optional[str] = None,
+                     timeout: Optional[float] = None) -> Tuple[int, str, str]:
+        """
+        Run a command to completion, returning (returncode, stdout, stderr).
+        The process runs inside ``sandbox`` and is pinned to ``cores`` when given,
+        and is killed after ``timeout`` seconds (EXECUTION_TIMEOUT by default).
+        With ``input_file`` the file itself becomes the process' stdin, so
+        the kernel streams it and it is never read into memory here.
+        """
+        name = command[0]
+        if input_file is not None:
+            input_data = None
+        if sandbox is not None:
+            command = sandbox.wrap(command, cwd)
+        command = scheduler.pin_command(command, cores)
+
+        with cls._stdin(input_data, input_file) as stdin, subprocess.Popen(
+            command,
+            stdin=stdin,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            cwd=cwd
+        ) as process:
+            try:
+                stdout, stderr = process.communicate(input_data, timeout=timeout or cls.EXECUTION_TIMEOUT)
             except subprocess.TimeoutExpired:
-                raise TimeoutException("Java execution timed out")
-    
+                # nsenter does not forward the kill to the program it forked,
+                # so tear the whole sandbox down before draining the pipes
+                if sandbox is not None:
+                    sandbox.terminate()
+                process.kill()
+                process.communicate()
+                raise TimeoutException(f"{name} timed out")
+
+        return process.returncode, stdout, stderr
+
     @classmethod
-    def _execute_javascript(cls, source_code: str, input_data: str = "") -> Dict:
-        """Execute JavaScript code using Node.js"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            source_file = os.path.join(temp_dir, 'main.js')
-            
-            with open(source_file, 'w') as f:
-                f.write(source_code)
-            
+    async def _arun_process(cls, command: List[str], input_data: Optional[str] = None,
+                            cwd: Optional[str] = None,
+                            sandbox: Optional[SandboxContext] = None,
+                            cores: Optional[List[int]] = None,
+                            input_file: Optional[str] = None,
+                            timeout: Optional[float] = None) -> Tuple[int, str, str]:
+        """Run a command as an asyncio subprocess, returning (returncode, stdout, stderr)"""
+        name = command[0]
+        if input_file is not None:
+            input_data = None
+        if sandbox is not None:
+            command = sandbox.wrap(command, cwd)
+        command = scheduler.pin_command(command, cores)
+
+        with cls._stdin(input_data, input_file) as stdin:
+            # Started in its own task: a start cancelled halfway would have
+            # asyncio wait for pipes that a sandboxed program still holds open
+            starting = asyncio.ensure_future(asyncio.create_subprocess_exec(
+                *command,
+                stdin=stdin,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd
+            ))
             try:
-                process = subprocess.run(
-                    ['node', source_file],
-                    input=input_data,
-                    capture_output=True,
-                    text=True,
-                    timeout=cls.EXECUTION_TIMEOUT
+                process = await asyncio.shield(starting)
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(input_data.encode('utf-8') if input_data is not None else None),
+                    timeout=timeout or cls.EXECUTION_TIMEOUT
                 )
-                
-                return {
-                    'success': process.returncode == 0,
-                    'output': cls._truncate_output(process.stdout),
-                    'error': cls._truncate_output(process.stderr) if process.returncode != 0 else '',
-                    'execution_time': 0
-                }
-                
-            except subprocess.TimeoutExpired:
-                raise TimeoutException("JavaScript execution timed out")
-    
+            except asyncio.TimeoutError:
+                if sandbox is not None:
+                    await asyncio.to_thread(sandbox.terminate)
+                process.kill()
+                await process.wait()
+                raise TimeoutException(f"{name} timed out")
+            except BaseException:
+                # Cancelled, e.g. when an ASGI client disconnects: the program
+                # must not outlive the request or keep running in a context
+                # that goes back to the pool. Nothing here awaits, so a second
+                # cancellation cannot interrupt it
+                if sandbox is not None:
+                    sandbox.terminate()
+                starting.add_done_callback(cls._kill_started)
+                raise
+
+        return (
+            process.returncode,
+            stdout.decode('utf-8', errors='replace'),
+            stderr.decode('utf-8', errors='replace'),
+        )
+
+    @staticmethod
+    def _kill_started(starting: asyncio.Future):
+        """Kill the process ``starting`` started, if it started and is still running"""
+        if starting.cancelled() or starting.exception() is not None:
+            return
+        process = starting.result()
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+
+    @staticmethod
+    @contextmanager
+    def _stdin(input_data: Optional[str], input_file: Optional[str]):
+        """Yield what to pass as a child's stdin: the input file, a pipe, or nothing"""
+        if input_file is not None:
+            with open(input_file, 'rb') as f:
+                yield f
+        else:
+            yield subprocess.PIPE if input_data is not None else subprocess.DEVNULL
+
     @classmethod
-    def _run_executable(cls, executable_path: str, input_data: str = "") -> Dict:
-        """Run a compiled executable"""
-        try:
-            process = subprocess.run(
-                [executable_path],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                timeout=cls.EXECUTION_TIMEOUT
-            )
-            
-            return {
-                'success': process.returncode == 0,
-                'output': cls._truncate_output(process.stdout),
-                'error': cls._truncate_output(process.stderr) if process.returncode != 0 else '',
-                'execution_time': 0
-            }
-            
-        except subprocess.TimeoutExpired:
-            raise TimeoutException("Executable timed out")
-    
+    def _build_result(cls, returncode: int, stdout: str, stderr: str) -> Dict:
+        """Build the result dict for a finished run"""
+        return {
+            'success': returncode == 0,
+            'output': cls._truncate_output(stdout),
+            'error': cls._truncate_output(stderr) if returncode != 0 else '',
+            'execution_time': 0
+        }
+
+    @staticmethod
+    def _compilation_error_result(stderr: str) -> Dict:
+        """Build the result dict for a failed compilation"""
+        return {
+            'success': False,
+            'output': '',
+            'error': f'Compilation Error:\n{stderr}',
+            'execution_time': 0
+        }
+
+    @staticmethod
+    def _missing_toolchain_result(missing: List[str]) -> Dict:
+        """Build the result dict for a language whose tools are not installed"""
+        return {
+            'success': False,
+            'output': '',
+            'error': f'Toolchain not available on this server: {", ".join(missing)}',
+            'execution_time': 0
+        }
+
+    @staticmethod
+    def _unsupported_result(language: str) -> Dict:
+        """Build the result dict for an unknown language"""
+        return {
+            'success': False,
+            'output': '',
+            'error': f'Unsupported language: {language}',
+            'execution_time': 0
+        }
+
     @classmethod
     def _truncate_output(cls, output: str) -> str:
         """Truncate output if it exceeds maximum size"""
         if len(output.encode('utf-8')) > cls.MAX_OUTPUT_SIZE:
             truncated = output.encode('utf-8')[:cls.MAX_OUTPUT_SIZE].decode('utf-8', errors='ignore')
-            return truncated + "\\n\\n[Output truncated due to size limit]"
+            return truncated + "\n\n[Output truncated due to size limit]"
         return output
+
+
+class StressTestService:
+    """
+    Service class for stress tests: compare a candidate solution against a
+    brute-force reference on generated inputs until they disagree.
+
+    The three programs are compiled once into one workspace. Each iteration
+    runs the generator with its seed as the first argument, then feeds the
+    generated input to both solutions; iterations run in parallel, one per
+    run core as far as the sandbox pool can spare the contexts, each thread
+    in its own workspace (see IterationWorkspaces), and the job stops at the
+    first counterexample.
+    """
+
+    # Upper bound on iterations per job
+    MAX_ITERATIONS = 10000
+
+    # Seconds between progress events
+    PROGRESS_INTERVAL = 0.5
+
+    # Programs in a job, in compile order
+    PROGRAMS = ('generator', 'brute', 'solution')
+
+    @classmethod
+    def run(cls, stress_test: StressTest) -> Iterator[Dict]:
+        """
+        Run a stress test, yielding progress events as it goes.
+        The final event carries the outcome, which is also saved on ``stress_test``.
+        """
+        start_time = time.time()
+        stress_test.status = 'running'
+        stress_test.save()
+
+        try:
+            yield {'event': 'started', 'id': str(stress_test.id), 'iterations': stress_test.iterations}
+            try:
+                with CodeExecutionService._workspace() as (temp_dir, sandbox):
+                    programs, error = cls._build_programs(stress_test, temp_dir, sandbox)
+                    if error:
+                        stress_test.status = 'error'
+                        stress_test.error_output = error
+                    else:
+                        yield {'event': 'compiled'}
+                        yield from cls._iterate(stress_test, programs, start_time)
+            except Exception as e:
+                stress_test.status = 'error'
+                stress_test.error_output = f'Stress test error: {str(e)}'
+        except GeneratorExit:
+            # The client went away mid-stream; record where the job stopped
+            stress_test.status = 'error'
+            stress_test.error_output = (
+                f'Stress test stopped after {stress_test.iterations_run} iterations: the client disconnected'
+            )
+            raise
+        finally:
+            stress_test.elapsed_time = time.time() - start_time
+            stress_test.completed_at = timezone.now()
+            stress_test.save()
+        yield cls._finished_event(stress_test)
+
+    @classmethod
+    def _build_programs(cls, stress_test: StressTest, temp_dir: str,
+                        sandbox: Optional[SandboxContext]) -> Tuple[Dict, str]:
+        """Prepare and compile every program, returning ``(programs, error)``"""
+        programs = {}
+        for name in cls.PROGRAMS:
+            language = getattr(stress_test, f'{name}_language')
+            source_code = getattr(stress_test, f'{name}_source')
+
+            missing = toolchain.missing_tools(language)
+            if missing:
+                return programs, f'{name}: Toolchain not available on this server: {", ".join(missing)}'
+
+            program_dir = os.path.join(temp_dir, name)
+            os.makedirs(program_dir, exist_ok=True)
+            program = CodeExecutionService._prepare_program(language, source_code, program_dir)
+            if program is None:
+                return programs, f'{name}: Unsupported language: {language}'
+
+            if program['compile']:
+                try:
+                    returncode, _, stderr = CodeExecutionService._run_process(
+                        program['compile'], cwd=program['cwd'], sandbox=sandbox,
+                        cores=scheduler.compile_cores()
+                    )
+                except TimeoutException:
+                    return programs, f'{name}: Compilation timed out'
+                if returncode != 0:
+                    return programs, f'{name}: Compilation Error:\n{stderr}'
+            program['time_limit'] = calibration.get_limits(
+                language, CodeExecutionService.EXECUTION_TIMEOUT
+            )['time_limit']
+            programs[name] = program
+        return programs, ''
+
+    @classmethod
+    def _iterate(cls, stress_test: StressTest, programs: Dict, start_time: float) -> Iterator[Dict]:
+        """Run the seeds in parallel until they are exhausted or one fails"""
+        workers = cls._worker_count()
+        seeds = iter(range(stress_test.start_seed, stress_test.start_seed + stress_test.iterations))
+        failure = None
+        last_progress = time.monotonic()
+
+        workspaces = IterationWorkspaces(programs)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        pending = set()
+        try:
+            while True:
+                # Keep a couple of iterations queued per worker so no core idles
+                while failure is None and len(pending) < workers * 2:
+                    seed = next(seeds, None)
+                    if seed is None:
+                        break
+                    pending.add(executor.submit(cls._run_iteration, workspaces, seed))
+                if not pending:
+                    break
+
+                done, pending = wait(pending, timeout=cls.PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # Seeds queued behind a failure are cancelled, not run
+                    if future.cancelled():
+                        continue
+                    outcome = future.result()
+                    stress_test.iterations_run += 1
+                    if outcome['verdict'] != 'ok' and (failure is None or outcome['seed'] < failure['seed']):
+                        failure = outcome
+
+                if failure is not None:
+                    for future in pending:
+                        future.cancel()
+                if time.monotonic() - last_progress >= cls.PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    yield cls._progress_event(stress_test, start_time)
+        finally:
+            # Also reached when the stream is closed early: drop queued seeds
+            # and wait for the running ones before their workspaces go away
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            workspaces.close()
+
+        if failure is None and stress_test.iterations_run < stress_test.iterations:
+            stress_test.status = 'error'
+            stress_test.error_output = (
+                f'Only {stress_test.iterations_run} of {stress_test.iterations} iterations ran'
+            )
+        elif failure is None:
+            stress_test.status = 'passed'
+        elif failure['verdict'] in ('generator_error', 'brute_error'):
+            stress_test.status = 'error'
+            stress_test.failing_seed = failure['seed']
+            stress_test.failing_input = failure['input']
+            stress_test.error_output = failure['error']
+        else:
+            stress_test.status = 'failed'
+            stress_test.verdict = failure['verdict']
+            stress_test.failing_seed = failure['seed']
+            stress_test.failing_input = failure['input']
+            stress_test.expected_output = failure['expected']
+            stress_test.actual_output = failure['actual']
+            stress_test.error_output = failure['error']
+
+    @staticmethod
+    def _worker_count() -> int:
+        """One worker per run core, but no more than the sandbox pool can spare"""
+        workers = scheduler.run_core_count() or os.cpu_count() or 1
+        pool = get_pool()
+        if pool is not None:
+            # Each worker holds a context of its own for the whole job
+            workers = min(workers, pool.spare())
+        return max(workers, 1)
+
+    @classmethod
+    def _run_iteration(cls, workspaces: 'IterationWorkspaces', seed: int) -> Dict:
+        """
+        Generate the input for ``seed`` and run both solutions on it in the
+        calling thread's workspace. Returns a dict whose ``verdict`` is
+        ``ok`` or a failure verdict.
+        """
+        outcome = {'seed': seed, 'input': '', 'expected': '', 'actual': '', 'error': ''}
+        programs, sandbox = workspaces.get()
+
+        def run(name, input_data=None, args=()):
+            program = programs[name]
+            with scheduler.run_core() as core:
+                return CodeExecutionService._run_process(
+                    program['run'] + list(args), input_data, cwd=program['cwd'], sandbox=sandbox,
+                    cores=[core] if core is not None else None, timeout=program['time_limit']
+                )
+
+        def fail(verdict, error):
+            outcome.update(verdict=verdict, error=error)
+            return outcome
+
+        try:
+            returncode, generated, stderr = run('generator', args=[str(seed)])
+        except TimeoutException:
+            return fail('generator_error', f'Generator timed out for seed {seed}')
+        if returncode != 0:
+            return fail('generator_error', f'Generator failed for seed {seed}:\n{stderr}')
+        outcome['input'] = cls._preview(generated)
+
+        try:
+            returncode, expected, stderr = run('brute', generated)
+        except TimeoutException:
+            return fail('brute_error', f'Brute-force solution timed out for seed {seed}')
+        if returncode != 0:
+            return fail('brute_error', f'Brute-force solution failed for seed {seed}:\n{stderr}')
+        outcome['expected'] = cls._preview(expected)
+
+        try:
+            returncode, actual, stderr = run('solution', generated)
+        except TimeoutException:
+            return fail('timeout', f'Solution timed out after {programs["solution"]["time_limit"]:g} seconds')
+        outcome['actual'] = cls._preview(actual)
+        if returncode != 0:
+            return fail('runtime_error', cls._preview(stderr))
+
+        if cls._normalize(actual) != cls._normalize(expected):
+            return fail('wrong_answer', '')
+        outcome['verdict'] = 'ok'
+        return outcome
+
+    @staticmethod
+    def _normalize(output: str) -> str:
+        """Ignore trailing whitespace on each line and trailing blank lines"""
+        return '\n'.join(line.rstrip() for line in output.rstrip().splitlines())
+
+    @staticmethod
+    def _preview(text: str) -> str:
+        """Cap stored counterexample text at the execution output preview size"""
+        data = text.encode('utf-8')
+        if len(data) <= CodeExecutionService.OUTPUT_PREVIEW_SIZE:
+            return text
+        return data[:CodeExecutionService.OUTPUT_PREVIEW_SIZE].decode('utf-8', errors='ignore')
+
+    @staticmethod
+    def _progress_event(stress_test: StressTest, start_time: float) -> Dict:
+        elapsed = time.time() - start_time
+        return {
+            'event': 'progress',
+            'iterations_run': stress_test.iterations_run,
+            'iterations': stress_test.iterations,
+            'iterations_per_second': round(stress_test.iterations_run / elapsed, 2) if elapsed else None,
+        }
+
+    @staticmethod
+    def _finished_event(stress_test: StressTest) -> Dict:
+        rate = stress_test.iterations_per_second
+        return {
+            'event': 'finished',
+            'id': str(stress_test.id),
+            'status': stress_test.status,
+            'verdict': stress_test.verdict,
+            'iterations_run': stress_test.iterations_run,
+            'iterations_per_second': round(rate, 2) if rate is not None else None,
+            'elapsed_time': stress_test.elapsed_time,
+            'failing_seed': stress_test.failing_seed,
+            'failing_input': stress_test.failing_input,
+            'expected_output': stress_test.expected_output,
+            'actual_output': stress_test.actual_output,
+            'error_output': stress_test.error_output,
+        }
+
+
+class IterationWorkspaces:
+    """
+    One workspace per stress-test thread, each holding a copy of the
+    compiled programs. Threads never share a sandbox, so a run that times
+    out (which tears its sandbox down) cannot take runs on other threads
+    with it; the thread that hit the timeout gets a fresh workspace for its
+    next iteration.
+    """
+
+    def __init__(self, programs: Dict):
+        self.programs = programs
+        self._local = threading.local()
+        self._open = set()
+        self._lock = threading.Lock()
+
+    def get(self) -> Tuple[Dict, Optional[SandboxContext]]:
+        """Return ``(programs, sandbox)`` of the calling thread's workspace"""
+        workspace = getattr(self._local, 'workspace', None)
+        if workspace is not None:
+            programs, sandbox, stack = workspace
+            if sandbox is None or sandbox.is_alive():
+                return programs, sandbox
+            self._close(stack)
+
+        stack = ExitStack()
+        with self._lock:
+            self._open.add(stack)
+        temp_dir, sandbox = stack.enter_context(CodeExecutionService._workspace())
+        programs = {
+            name: self._copy(program, os.path.join(temp_dir, name))
+            for name, program in self.programs.items()
+        }
+        self._local.workspace = (programs, sandbox, stack)
+        return programs, sandbox
+
+    @staticmethod
+    def _copy(program: Dict, cwd: str) -> Dict:
+        """Copy a built program into ``cwd``, pointing its run command at the copy"""
+        shutil.copytree(program['cwd'], cwd)
+        prefix = program['cwd'] + os.sep
+        run = [cwd + os.sep + arg[len(prefix):] if arg.startswith(prefix) else arg for arg in program['run']]
+        return dict(program, run=run, cwd=cwd)
+
+    def _close(self, stack: ExitStack):
+        with self._lock:
+            self._open.discard(stack)
+        stack.close()
+
+    def close(self):
+        """Release every workspace (call once no iteration is running)"""
+        with self._lock:
+            stacks = list(self._open)
+        for stack in stacks:
+            self._close(stack)
@@ -1,3 +1,1029 @@
-from django.test import TestCase
+# AaryaOnlineCompiler - Tests
+# Created by Aarya Agarwal
 
-# Create your tests here.
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import SkipTest, mock
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from . import calibration, profiling, scheduler, search, toolchain
+from .admin import CodeExecutionAdmin
+from .coalescing import Coalescer
+from .middleware import CompressionMiddleware
+from .models import CodeExecution, NodeCalibration, StressTest
+from .sandbox import SandboxPool, SandboxUnavailable
+from .services import CodeExecutionService, StressTestService
+from .uploads import InputTooLarge, InputUploadHandler, text_digest
+
+
+class CompressionMiddlewareTests(TestCase):
+    """Response compression must not get in the way of ranges or streams"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def process(self, response):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compresses_large_responses(self):
+        response = self.process(HttpResponse('x' * 1000))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_leaves_partial_content_alone(self):
+        response = self.process(HttpResponse('x' * 1000, status=206))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_leaves_streams_alone(self):
+        response = self.process(StreamingHttpResponse(
+            (b'{"event": "progress"}\n' for _ in range(100)), content_type='application/x-ndjson'
+        ))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(next(iter(response)), b'{"event": "progress"}\n')
+
+
+class CodeExecutionAdminTests(TestCase):
+
+    def test_queryset_defers_archives(self):
+        admin = CodeExecutionAdmin(CodeExecution, site)
+        queryset = admin.get_queryset(RequestFactory().get('/'))
+        deferred, _ = queryset.query.deferred_loading
+        self.assertEqual(deferred, {'output_archive', 'error_output_archive', 'profile_archive'})
+
+
+class SandboxTests(SimpleTestCase):
+    """Isolation of the namespace sandbox; skipped where namespaces are unavailable"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.base_dir = tempfile.mkdtemp(dir=settings.TEMP_FILES_DIR)
+        cls.pool = SandboxPool(cls.base_dir, size=1, max_size=2, max_uses=50,
+                               readonly_paths=['/usr', '/bin', '/lib', '/lib64', '/etc'])
+        try:
+            cls.pool.start()
+        except (SandboxUnavailable, OSError) as e:
+            shutil.rmtree(cls.base_dir, ignore_errors=True)
+            raise SkipTest(f'namespace sandbox unavailable: {e}')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+        shutil.rmtree(cls.base_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def run_in(self, context, script):
+        return CodeExecutionService._run_process(
+            ['sh', '-c', script], cwd=context.scratch_dir, sandbox=context
+        )
+
+    def test_runs_in_scratch_dir(self):
+        with self.pool.lease(5) as context:
+            returncode, stdout, _ = self.run_in(context, 'pwd')
+        self.assertEqual(returncode, 0)
+        self.assertEqual(stdout.strip(), context.scratch_dir)
+
+    def test_host_tree_is_unreachable(self):
+        with self.pool.lease(5) as context:
+            returncode, stdout, _ = self.run_in(context, f'ls {"../" * 12}; echo; ls {settings.BASE_DIR}')
+        self.assertEqual(returncode, 0)
+        root, project = stdout.split('\n\n')
+        # Only the toolchain paths and the directories leading to the scratch dir exist
+        self.assertNotIn('var', root.split())
+        self.assertEqual(project.split(), ['temp_files'])
+
+    def test_scratch_dir_is_the_only_writable_path(self):
+        with self.pool.lease(5) as context:
+            returncode, _, _ = self.run_in(context, 'touch out && touch /tmp/out && ! touch /usr/out')
+            self.assertEqual(returncode, 0)
+            self.assertTrue(os.path.exists(os.path.join(context.scratch_dir, 'out')))
+
+    def test_context_with_leftover_processes_is_retired(self):
+        with self.pool.lease(5) as context:
+            self.run_in(context, '(sleep 30 >/dev/null 2>&1 &)')
+            self.assertFalse(context.is_idle())
+        self.assertFalse(context.is_alive())
+
+    def test_scratch_dir_is_reset_between_runs(self):
+        with self.pool.lease(5) as context:
+            self.run_in(context, 'echo secret > input.txt')
+        with self.pool.lease(5) as context:
+            self.assertEqual(os.listdir(context.scratch_dir), [])
+
+    def test_tmp_is_reset_between_runs(self):
+        with self.pool.lease(5) as context:
+            self.run_in(context, 'echo secret > /tmp/secret && mkdir /tmp/dir')
+        with self.pool.lease(5) as reused:
+            self.assertIs(reused, context)
+            returncode, stdout, _ = self.run_in(reused, 'ls -A /tmp')
+        self.assertEqual((returncode, stdout), (0, ''))
+
+    def test_async_lease_waits_for_a_release(self):
+        async def lease_all():
+            first = await self.pool.aacquire(5)
+            second = await self.pool.aacquire(5)
+            # The pool is at max_size now: the next caller waits without a thread
+            waiting = asyncio.ensure_future(self.pool.aacquire(5))
+            await asyncio.sleep(0.05)
+            self.assertFalse(waiting.done())
+            self.pool.release(first)
+            third = await waiting
+            self.pool.release(second)
+            self.pool.release(third)
+
+        asyncio.run(lease_all())
+
+    def test_spare_counts_leased_contexts(self):
+        self.assertEqual(self.pool.spare(), 2)
+        context = self.pool.acquire(5)
+        try:
+            self.assertEqual(self.pool.spare(), 1)
+        finally:
+            self.pool.release(context)
+        self.assertEqual(self.pool.spare(), 2)
+
+    def test_acquire_times_out(self):
+        contexts = [self.pool.acquire(5), self.pool.acquire(5)]
+        start = time.monotonic()
+        try:
+            with self.assertRaises(SandboxUnavailable):
+                self.pool.acquire(0.1)
+        finally:
+            for context in contexts:
+                self.pool.release(context)
+        self.assertLess(time.monotonic() - start, 1)
+
+
+class SchedulerTests(SimpleTestCase):
+
+    def setUp(self):
+        scheduler._layout = None
+        self.addCleanup(setattr, scheduler, '_layout', None)
+
+    def layout(self, **config):
+        with override_settings(EXECUTION_CPU_AFFINITY={'ENABLED': True, **config}), \
+                mock.patch.object(scheduler, 'available_cores', return_value=[0, 1, 2, 3, 4, 5, 6, 7]):
+            return scheduler._get_layout()
+
+    def test_default_split(self):
+        layout = self.layout()
+        self.assertEqual(layout['compile_cores'], [0, 1])
+        self.assertEqual(layout['run_pool'].cores, [2, 3, 4, 5, 6, 7])
+
+    def test_configured_compile_cores_are_not_run_cores(self):
+        layout = self.layout(COMPILE_CORES=[6, 7])
+        self.assertEqual(layout['compile_cores'], [6, 7])
+        self.assertEqual(layout['run_pool'].cores, [0, 1, 2, 3, 4, 5])
+
+    def test_configured_run_cores_are_not_compile_cores(self):
+        layout = self.layout(RUN_CORES=[0, 1, 2, 3])
+        self.assertEqual(layout['compile_cores'], [4, 5, 6, 7])
+        self.assertEqual(layout['run_pool'].cores, [0, 1, 2, 3])
+
+    def test_pinned_process_runs_on_its_core(self):
+        core = scheduler.available_cores()[-1]
+        returncode, stdout, _ = CodeExecutionService._run_process(
+            ['grep', 'Cpus_allowed_list', '/proc/self/status'], cores=[core]
+        )
+        self.assertEqual(returncode, 0)
+        self.assertEqual(stdout.split()[-1], str(core))
+
+    def test_async_lease_polls_without_a_thread(self):
+        pool = scheduler.CorePool([0], tempfile.mkdtemp(dir=settings.TEMP_FILES_DIR))
+        self.addCleanup(shutil.rmtree, pool.lock_dir)
+
+        async def lease_twice():
+            async with pool.alease(1) as core:
+                self.assertEqual(core, 0)
+                # Busy: the second lease gives up and the caller runs unpinned
+                self.assertIsNone(await pool.aacquire(0.02))
+            async with pool.alease(1) as core:
+                self.assertEqual(core, 0)
+
+        asyncio.run(lease_twice())
+
+
+CALIBRATION = {
+    'ENABLED': True,
+    'NODE_NAME': 'test-node',
+    'LANGUAGE_MULTIPLIERS': {'python': 2.0},
+    'CACHE_SECONDS': 300,
+}
+
+
+@override_settings(EXECUTION_CALIBRATION=CALIBRATION)
+class CalibrationTests(TestCase):
+
+    def setUp(self):
+        calibration.invalidate()
+        self.addCleanup(calibration.invalidate)
+
+    def calibrate(self, language, speed_factor):
+        NodeCalibration.objects.update_or_create(node='test-node', language=language, defaults={
+            'reference_time': 1.0, 'measured_time': speed_factor, 'speed_factor': speed_factor,
+        })
+
+    def test_limits_scale_by_multiplier_and_speed_factor(self):
+        self.calibrate('python', 1.5)
+        self.assertEqual(calibration.get_limits('python', 2), {'time_limit': 6.0, 'speed_factor': 1.5})
+        # Neither a multiplier nor a calibration: the base timeout as is
+        self.assertEqual(calibration.get_limits('cpp', 2), {'time_limit': 2, 'speed_factor': 1.0})
+
+    def test_limits_use_the_given_factors(self):
+        self.calibrate('python', 1.5)
+        limits = calibration.get_limits('python', 2, factors={'python': 0.5})
+        self.assertEqual(limits, {'time_limit': 2.0, 'speed_factor': 0.5})
+
+    @override_settings(EXECUTION_CALIBRATION={**CALIBRATION, 'ENABLED': False})
+    def test_disabled(self):
+        self.calibrate('python', 1.5)
+        self.assertEqual(calibration.get_factors(), {})
+        self.assertEqual(calibration.get_limits('python', 2), {'time_limit': 2, 'speed_factor': 1.0})
+
+    def test_normalize(self):
+        self.assertEqual(calibration.normalize(3.0, 1.5), 2.0)
+        self.assertIsNone(calibration.normalize(None, 1.5))
+
+    def test_factors_are_cached_until_invalidated(self):
+        self.calibrate('python', 1.5)
+        self.assertEqual(calibration.get_factors(), {'python': 1.5})
+        self.calibrate('python', 3.0)
+        with self.assertNumQueries(0):
+            self.assertEqual(calibration.get_factors(), {'python': 1.5})
+        calibration.invalidate()
+        self.assertEqual(calibration.get_factors(), {'python': 3.0})
+
+    def test_factors_expire(self):
+        self.calibrate('python', 1.5)
+        with override_settings(EXECUTION_CALIBRATION={**CALIBRATION, 'CACHE_SECONDS': 0}):
+            self.assertEqual(calibration.get_factors(), {'python': 1.5})
+            self.calibrate('python', 3.0)
+            self.assertEqual(calibration.get_factors(), {'python': 3.0})
+
+    def test_calibrate_node_dry_run(self):
+        if toolchain.missing_tools('python'):
+            self.skipTest('python3 is not available')
+        out = StringIO()
+        call_command('calibrate_node', '--dry-run', '--language', 'python', '--runs', '1', stdout=out)
+        self.assertRegex(out.getvalue(), r'python +median=[0-9.]+s +reference=0\.800s +factor=')
+        self.assertFalse(NodeCalibration.objects.exists())
+
+    def test_calibrate_node_saves_factors(self):
+        self.calibrate('python', 3.0)
+        self.assertEqual(calibration.get_factors(), {'python': 3.0})
+        with mock.patch.object(toolchain, 'missing_tools', return_value=[]), \
+                mock.patch('compiler.management.commands.calibrate_node.Command._measure',
+                           return_value=[0.3, 0.4, 0.5]):
+            call_command('calibrate_node', '--language', 'python', stdout=StringIO())
+        saved = NodeCalibration.objects.get(node='test-node', language='python')
+        self.assertEqual((saved.measured_time, saved.speed_factor), (0.4, 0.5))
+        # The command drops the cached factors
+        self.assertEqual(calibration.get_factors(), {'python': 0.5})
+
+    def test_calibrate_node_fails_without_toolchains(self):
+        with mock.patch.object(toolchain, 'missing_tools', return_value=['python3']):
+            with self.assertRaisesMessage(CommandError, 'No language could be calibrated'):
+                call_command('calibrate_node', '--language', 'python', stdout=StringIO())
+
+
+@override_settings(EXECUTION_PREFLIGHT={'ENABLED': False})
+class SearchTests(TestCase):
+
+    def completed(self, source_code, output=''):
+        execution = CodeExecution.objects.create(language='python', source_code=source_code, output=output)
+        execution.mark_completed()
+        return execution
+
+    def search(self, query):
+        response = self.client.get('/api/execute/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [execution['id'] for execution in response.json()['executions']]
+
+    def test_fts5_query_quotes_every_term(self):
+        self.assertEqual(search._fts5_query('a.b() -x'), '"a.b()" "-x"')
+        self.assertEqual(search._fts5_query('say "hi"'), '"say" """hi"""')
+        self.assertEqual(search._fts5_query('  '), '')
+
+    def test_finds_completed_executions(self):
+        execution = self.completed('print("zebra")', output='zebra')
+        self.completed('print("giraffe")')
+        self.assertEqual(self.search('zebra'), [str(execution.id)])
+        self.assertEqual(self.search('print zebra'), [str(execution.id)])
+        self.assertEqual(self.search('zebra okapi'), [])
+
+    def test_code_punctuation_is_not_parsed_as_query_syntax(self):
+        execution = self.completed('x = -1\nprint(x)')
+        self.assertEqual(self.search('-1 print(x) "x'), [str(execution.id)])
+
+    def test_indexes_on_completion_only(self):
+        execution = CodeExecution.objects.create(language='python', source_code='print("okapi")')
+        self.assertEqual(self.search('okapi'), [])
+        execution.mark_completed()
+        self.assertEqual(self.search('okapi'), [str(execution.id)])
+
+    def test_deleted_executions_leave_the_index(self):
+        execution = self.completed('print("tapir")')
+        execution.delete()
+        self.assertEqual(search.search_execution_ids('tapir'), [])
+
+    def test_rebuild_index(self):
+        execution = self.completed('print("quokka")')
+        CodeExecution.objects.create(language='python', source_code='print("quokka")')
+        self.assertEqual(search.rebuild_index(), 1)
+        self.assertEqual(search.search_execution_ids('quokka'), [execution.id])
+
+
+
+@override_settings(EXECUTION_CALIBRATION={'ENABLED': False}, EXECUTION_PREFLIGHT={'ENABLED': False})
+class SearchAfterTableRebuildTests(TransactionTestCase):
+    """
+    Migrations such as 0007 and 0009 make SQLite rebuild
+    compiler_codeexecution, which drops any trigger on it; the index must
+    not depend on one. Not atomic: the SQLite schema editor cannot run
+    inside a transaction.
+    """
+
+    def execute(self, source_code, input_data):
+        response = self.client.post('/api/execute/', {
+            'language': 'python',
+            'source_code': source_code,
+            'input_file': SimpleUploadedFile('input.txt', input_data),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'completed')
+        return response.json()['id']
+
+    def search(self, query):
+        response = self.client.get('/api/execute/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [execution['id'] for execution in response.json()['executions']]
+
+    def test_executions_are_found_after_the_table_is_rebuilt(self):
+        if connection.vendor != 'sqlite':
+            raise SkipTest('Table rebuilds are specific to SQLite')
+        if toolchain.missing_tools('python'):
+            raise SkipTest('python3 is not available')
+
+        before = self.execute('print(input()[::-1])', b'arbez')
+        self.assertEqual(self.search('zebra'), [before])
+
+        with connection.schema_editor() as schema_editor:
+            schema_editor._remake_table(CodeExecution)
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM')
+
+        self.assertEqual(self.search('zebra'), [before])
+        after = self.execute('print(input().upper())', b'okapi')
+        self.assertEqual(self.search('OKAPI'), [after])
+        CodeExecution.objects.filter(id=before).delete()
+        self.assertEqual(self.search('zebra'), [])
+
+class CoalescerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.lock_dir = tempfile.mkdtemp(dir=settings.TEMP_FILES_DIR)
+        self.addCleanup(shutil.rmtree, self.lock_dir)
+        self.coalescer = Coalescer(self.lock_dir, slots=16, wait_timeout=5, result_ttl=0.2)
+
+    def run_concurrently(self, calls):
+        results = [None] * len(calls)
+
+        def call(i):
+            results[i] = calls[i]()
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(len(calls))]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def slow_work(self, outcome, runs):
+        def work():
+            runs.append(outcome)
+            time.sleep(0.3)
+            return {'outcome': outcome}
+        return work
+
+    def test_followers_share_the_leaders_outcome(self):
+        runs = []
+        key = Coalescer.key('python', 'print(1)', '')
+        results = self.run_concurrently([
+            lambda: self.coalescer.run(key, 'leader', self.slow_work('first', runs)),
+            lambda: self.coalescer.run(key, 'follower', self.slow_work('second', runs)),
+        ])
+        self.assertEqual(runs, ['first'])
+        self.assertEqual(results, [({'outcome': 'first'}, None), ({'outcome': 'first'}, 'leader')])
+
+    def test_different_keys_run_separately(self):
+        runs = []
+        results = self.run_concurrently([
+            lambda: self.coalescer.run(Coalescer.key('a'), 'one', self.slow_work('one', runs)),
+            lambda: self.coalescer.run(Coalescer.key('b'), 'two', self.slow_work('two', runs)),
+        ])
+        self.assertEqual(sorted(runs), ['one', 'two'])
+        self.assertEqual(results, [({'outcome': 'one'}, None), ({'outcome': 'two'}, None)])
+
+    def test_followers_run_on_their_own_when_the_leader_fails(self):
+        runs = []
+        key = Coalescer.key('python', 'print(1)', '')
+
+        def failing():
+            time.sleep(0.2)
+            raise RuntimeError('leader failed')
+
+        def lead():
+            with self.assertRaises(RuntimeError):
+                self.coalescer.run(key, 'leader', failing)
+
+        results = self.run_concurrently([
+            lead,
+            lambda: self.coalescer.run(key, 'follower', self.slow_work('follower', runs)),
+        ])
+        self.assertEqual(runs, ['follower'])
+        self.assertEqual(results[1], ({'outcome': 'follower'}, None))
+
+    def test_published_outcome_expires(self):
+        key = Coalescer.key('python', 'print(1)', '')
+        self.coalescer.run(key, 'leader', lambda: {'outcome': 'secret'})
+        result_path = self.coalescer._slot_path(key) + '.result'
+        self.assertTrue(os.path.exists(result_path))
+        deadline = time.monotonic() + 5
+        while os.path.exists(result_path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(os.path.exists(result_path))
+
+
+@override_settings(EXECUTION_CALIBRATION={'ENABLED': False}, EXECUTION_PREFLIGHT={'ENABLED': False})
+class CoalescedExecutionTests(TestCase):
+    """
+    Coalescing through the service and the API. Submissions overlap on the
+    event loop rather than in threads, which the in-memory test database
+    cannot serve concurrently.
+    """
+
+    SOURCE = 'import time\ntime.sleep(0.5)\nprint(input())'
+
+    async def staggered(self, calls):
+        async def call(delay, function):
+            await asyncio.sleep(delay)
+            return await function()
+        return await asyncio.gather(*(call(i * 0.1, function) for i, function in enumerate(calls)))
+
+    async def test_different_inputs_are_not_shared(self):
+        # Created without input hashes, which the service fills in
+        executions = [
+            await CodeExecution.objects.acreate(language='python', source_code=self.SOURCE, input_data=f'input-{i}')
+            for i in range(3)
+        ]
+        await self.staggered([
+            lambda execution=execution: CodeExecutionService.aexecute_code(execution)
+            for execution in executions
+        ])
+        for i, execution in enumerate(executions):
+            await execution.arefresh_from_db()
+            self.assertEqual(execution.output, f'input-{i}\n')
+            self.assertIsNone(execution.coalesced_from)
+            self.assertEqual(execution.input_sha256, text_digest(f'input-{i}')[1])
+
+    async def test_identical_submissions_share_a_run(self):
+        async def post():
+            response = await self.async_client.post('/api/execute/async/', {
+                'language': 'python', 'source_code': self.SOURCE, 'input_data': 'okapi',
+            }, content_type='application/json')
+            return response.json()
+
+        leader, follower = await self.staggered([post, post])
+        self.assertEqual((leader['output'], follower['output']), ('okapi\n', 'okapi\n'))
+        self.assertFalse(leader['coalesced'])
+        self.assertNotIn('note', leader)
+        self.assertTrue(follower['coalesced'])
+        self.assertEqual(follower['coalesced_from'], leader['id'])
+        self.assertIn('identical submission', follower['note'])
+        execution = await CodeExecution.objects.aget(id=follower['id'])
+        self.assertEqual(str(execution.coalesced_from), leader['id'])
+
+
+class PreflightTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(toolchain, 'start_background_preflight')
+        self.start = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, toolchain, '_preflight_pid', None)
+        self.addCleanup(toolchain._state.update, dict(toolchain._state))
+        toolchain._preflight_pid = None
+
+    @override_settings(EXECUTION_PREFLIGHT={'ENABLED': True})
+    def test_starts_once_per_process(self):
+        toolchain.ensure_preflight()
+        toolchain.ensure_preflight()
+        self.assertEqual(self.start.call_count, 1)
+        # A forked worker inherits the flag of its parent but not the thread
+        toolchain._preflight_pid = os.getppid()
+        toolchain.ensure_preflight()
+        self.assertEqual(self.start.call_count, 2)
+
+    @override_settings(EXECUTION_PREFLIGHT={'ENABLED': False})
+    def test_disabled(self):
+        toolchain.ensure_preflight()
+        self.start.assert_not_called()
+        self.assertEqual(self.client.get('/api/health/').status_code, 200)
+
+    @override_settings(EXECUTION_PREFLIGHT={'ENABLED': True})
+    def test_first_request_starts_it_and_health_waits(self):
+        response = self.client.get('/api/health/')
+        self.start.assert_called_once()
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['ready'])
+
+    @override_settings(EXECUTION_PREFLIGHT={'ENABLED': True})
+    async def test_first_async_request_starts_it(self):
+        response = await self.async_client.get('/api/health/')
+        self.start.assert_called_once()
+        self.assertEqual(response.status_code, 503)
+
+
+# Stress-test programs; the generator prints its seed
+GENERATOR = 'import sys\nprint(sys.argv[1])'
+ECHO = 'print(input())'
+# The same, but hanging on seed 2
+GENERATOR_HANGING = 'import sys, time\nif sys.argv[1] == "2":\n    time.sleep(60)\nprint(sys.argv[1])'
+ECHO_HANGING = 'import time\nx = input()\nif x == "2":\n    time.sleep(60)\nprint(x)'
+
+
+@override_settings(EXECUTION_CALIBRATION={'ENABLED': False}, EXECUTION_PREFLIGHT={'ENABLED': False})
+class StressTestTests(TestCase):
+    """Verdicts of whole stress-test jobs, with one-second time limits"""
+
+    def setUp(self):
+        patcher = mock.patch.object(CodeExecutionService, 'EXECUTION_TIMEOUT', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Several iterations in flight even on a single-core machine
+        patcher = mock.patch.object(scheduler, 'run_core_count', return_value=3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stress(self, generator=GENERATOR, brute=ECHO, solution=ECHO, iterations=6,
+               solution_language='python'):
+        stress_test = StressTest.objects.create(
+            generator_language='python', generator_source=generator,
+            brute_language='python', brute_source=brute,
+            solution_language=solution_language, solution_source=solution,
+            iterations=iterations
+        )
+        events = list(StressTestService.run(stress_test))
+        stress_test.refresh_from_db()
+        return stress_test, events
+
+    def test_passed(self):
+        stress_test, events = self.stress()
+        self.assertEqual(stress_test.status, 'passed')
+        self.assertEqual(stress_test.iterations_run, 6)
+        self.assertEqual([events[0]['event'], events[1]['event'], events[-1]['event']],
+                         ['started', 'compiled', 'finished'])
+        self.assertEqual(events[-1]['status'], 'passed')
+
+    def test_wrong_answer_reports_the_lowest_failing_seed(self):
+        solution = 'x = input()\nprint("0" if x in ("3", "5") else x)'
+        stress_test, _ = self.stress(solution=solution)
+        self.assertEqual((stress_test.status, stress_test.verdict), ('failed', 'wrong_answer'))
+        self.assertEqual(stress_test.failing_seed, 3)
+        self.assertEqual(stress_test.expected_output.strip(), '3')
+        self.assertEqual(stress_test.actual_output.strip(), '0')
+
+    def test_runtime_error(self):
+        stress_test, _ = self.stress(solution='x = input()\nassert x != "2"\nprint(x)')
+        self.assertEqual((stress_test.status, stress_test.verdict), ('failed', 'runtime_error'))
+        self.assertEqual(stress_test.failing_seed, 2)
+
+    def test_solution_timeout(self):
+        stress_test, _ = self.stress(solution=ECHO_HANGING)
+        self.assertEqual((stress_test.status, stress_test.verdict), ('failed', 'timeout'))
+        self.assertEqual(stress_test.failing_seed, 2)
+
+    def test_generator_timeout_is_not_a_pass(self):
+        stress_test, _ = self.stress(generator=GENERATOR_HANGING)
+        self.assertEqual(stress_test.status, 'error')
+        self.assertEqual(stress_test.failing_seed, 2)
+        self.assertEqual(stress_test.error_output, 'Generator timed out for seed 2')
+
+    def test_brute_timeout_is_not_a_pass(self):
+        stress_test, _ = self.stress(brute=ECHO_HANGING)
+        self.assertEqual(stress_test.status, 'error')
+        self.assertEqual(stress_test.failing_seed, 2)
+        self.assertEqual(stress_test.error_output, 'Brute-force solution timed out for seed 2')
+
+    def test_workers_are_capped_by_the_sandbox_pool(self):
+        pool = mock.Mock(spec=SandboxPool)
+        with mock.patch('compiler.services.get_pool', return_value=pool):
+            pool.spare.return_value = 2
+            self.assertEqual(StressTestService._worker_count(), 2)
+            pool.spare.return_value = 8
+            self.assertEqual(StressTestService._worker_count(), 3)
+            # With nothing to spare the job still makes progress, one context at a time
+            pool.spare.return_value = 0
+            self.assertEqual(StressTestService._worker_count(), 1)
+
+    def test_compilation_error(self):
+        if toolchain.missing_tools('cpp') or not shutil.which('g++'):
+            self.skipTest('g++ is not available')
+        stress_test, _ = self.stress(solution='int main() {', solution_language='cpp')
+        self.assertEqual(stress_test.status, 'error')
+        self.assertTrue(stress_test.error_output.startswith('solution: Compilation Error'))
+        self.assertEqual(stress_test.iterations_run, 0)
+
+    def test_stream_is_not_compressed(self):
+        response = self.client.post('/api/stress/', {
+            'generator': {'language': 'python', 'source_code': GENERATOR},
+            'brute': {'language': 'python', 'source_code': ECHO},
+            'solution': {'language': 'python', 'source_code': ECHO},
+            'iterations': 3,
+        }, content_type='application/json', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        events = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(events[-1]['status'], 'passed')
+
+    def test_disconnect_records_a_final_status(self):
+        response = self.client.post('/api/stress/', {
+            'generator': {'language': 'python', 'source_code': GENERATOR},
+            'brute': {'language': 'python', 'source_code': ECHO},
+            'solution': {'language': 'python', 'source_code': ECHO},
+            'iterations': 100,
+        }, content_type='application/json')
+        started = json.loads(next(iter(response.streaming_content)))
+        response.close()
+        stress_test = StressTest.objects.get(id=started['id'])
+        self.assertEqual(stress_test.status, 'error')
+        self.assertIn('client disconnected', stress_test.error_output)
+        self.assertIsNotNone(stress_test.completed_at)
+
+
+@override_settings(EXECUTION_CALIBRATION={'ENABLED': False}, EXECUTION_PREFLIGHT={'ENABLED': False})
+class AsyncStressStreamTests(TransactionTestCase):
+    """
+    Stress-test streams under ASGI. Not atomic: the job runs in a thread of
+    its own, with its own database connection.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.object(scheduler, 'run_core_count', return_value=3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def start(self, iterations, solution=ECHO):
+        response = await self.async_client.post('/api/stress/', {
+            'generator': {'language': 'python', 'source_code': GENERATOR},
+            'brute': {'language': 'python', 'source_code': ECHO},
+            'solution': {'language': 'python', 'source_code': solution},
+            'iterations': iterations,
+        }, content_type='application/json')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertTrue(response.is_async)
+        return response
+
+    async def test_events_are_sent_as_they_happen(self):
+        response = await self.start(12, solution='import time\ntime.sleep(0.1)\n' + ECHO)
+        events = []
+        async for chunk in response.streaming_content:
+            for line in chunk.splitlines():
+                events.append((time.monotonic(), json.loads(line)))
+        self.assertEqual(events[0][1]['event'], 'started')
+        self.assertEqual(events[-1][1]['status'], 'passed')
+        # A buffered stream would deliver every event at once when the job ends
+        self.assertGreater(events[-1][0] - events[0][0], 0.3)
+
+    async def test_disconnect_closes_the_job(self):
+        response = await self.start(1000)
+        content = response.streaming_content
+        started = json.loads(await anext(content))
+        # What Django's ASGI handler does once the client has gone away
+        await content.aclose()
+        await sync_to_async(response.close)()
+
+        deadline = time.monotonic() + 10
+        stress_test = await StressTest.objects.aget(id=started['id'])
+        while stress_test.completed_at is None and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+            stress_test = await StressTest.objects.aget(id=started['id'])
+        self.assertEqual(stress_test.status, 'error')
+        self.assertIn('client disconnected', stress_test.error_output)
+        self.assertLess(stress_test.iterations_run, 1000)
+
+
+def running_programs(marker):
+    """Pids of live processes whose command line mentions ``marker``"""
+    pids = []
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                if marker.encode() in f.read():
+                    pids.append(int(pid))
+        except OSError:
+            pass
+    return pids
+
+
+@override_settings(EXECUTION_CALIBRATION={'ENABLED': False}, EXECUTION_PREFLIGHT={'ENABLED': False})
+class AsyncExecutionTests(TestCase):
+
+    async def test_execute_code(self):
+        execution = await CodeExecution.objects.acreate(
+            language='python', source_code='print(input()[::-1])', input_data='arbez'
+        )
+        result = await CodeExecutionService.aexecute_code(execution, coalesce=False)
+        self.assertTrue(result['success'])
+        await execution.arefresh_from_db()
+        self.assertEqual((execution.status, execution.output), ('completed', 'zebra\n'))
+        self.assertIsNotNone(execution.completed_at)
+
+    async def test_timeout(self):
+        execution = await CodeExecution.objects.acreate(
+            language='python', source_code='while True:\n    pass'
+        )
+        with mock.patch.object(CodeExecutionService, 'EXECUTION_TIMEOUT', 0.5):
+            await CodeExecutionService.aexecute_code(execution, coalesce=False)
+        await execution.arefresh_from_db()
+        self.assertEqual(execution.status, 'timeout')
+
+    async def test_cancelling_kills_the_program_and_closes_the_record(self):
+        # Sleeps rather than spins so it would outlive its time limit if it were left running
+        execution = await CodeExecution.objects.acreate(
+            language='python', source_code='import time\nwhile True:\n    time.sleep(0.05)'
+        )
+        task = asyncio.ensure_future(CodeExecutionService.aexecute_code(execution, coalesce=False))
+        deadline = time.monotonic() + 10
+        while not running_programs('main.py') and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self.assertTrue(running_programs('main.py'))
+
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        deadline = time.monotonic() + 2
+        while running_programs('main.py') and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self.assertEqual(running_programs('main.py'), [])
+
+        await execution.arefresh_from_db()
+        self.assertEqual(execution.status, 'error')
+        self.assertIn('cancelled', execution.error_output)
+        self.assertIsNotNone(execution.completed_at)
+
+    async def test_view(self):
+        response = await self.async_client.post('/api/execute/async/', {
+            'language': 'python', 'source_code': 'print(input()[::-1])', 'input_data': 'arbez',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['output'], 'zebra\n')
+        self.assertEqual(response.json()['input_size'], 5)
+
+    async def test_view_with_uploaded_input(self):
+        response = await self.async_client.post('/api/execute/async/', {
+            'language': 'python', 'source_code': 'print(input().upper())',
+            'input_file': SimpleUploadedFile('input.txt', b'okapi'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['output'], 'OKAPI\n')
+
+    @override_settings(EXECUTION_CPU_AFFINITY={'ENABLED': False})
+    async def test_concurrent_requests_overlap(self):
+        # Through the full middleware stack: one sync-only middleware would
+        # make Django serve these one after another
+        scheduler._layout = None
+        self.addCleanup(setattr, scheduler, '_layout', None)
+
+        async def post(i):
+            return await self.async_client.post('/api/execute/async/', {
+                'language': 'python', 'source_code': f'import time\ntime.sleep(1)\nprint({i})',
+                'coalesce': False,
+            }, content_type='application/json')
+
+        start = time.monotonic()
+        responses = await asyncio.gather(*(post(i) for i in range(4)))
+        elapsed = time.monotonic() - start
+        self.assertEqual([response.json()['output'] for response in responses], ['0\n', '1\n', '2\n', '3\n'])
+        self.assertLess(elapsed, 2.5)
+
+    async def test_view_rejects_invalid_requests(self):
+        response = await self.async_client.post(
+            '/api/execute/async/', b'{', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.post(
+            '/api/execute/async/', {'language': 'cobol'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(EXECUTION_PREFLIGHT={'ENABLED': False})
+class ExecutionOutputViewTests(TestCase):
+
+    def setUp(self):
+        self.execution = CodeExecution.objects.create(language='python', source_code='')
+        self.text = ''.join(f'line {i}\n' for i in range(1, 11))
+        self.execution.store_output('output', self.text, preview_size=16)
+        self.execution.save()
+        self.url = f'/api/execute/{self.execution.id}/output/'
+
+    def test_full_output_beyond_the_preview(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode(), self.text)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_byte_ranges(self):
+        data = self.text.encode()
+        for header, expected, content_range in [
+            ('bytes=0-5', data[:6], f'bytes 0-5/{len(data)}'),
+            ('bytes=7-', data[7:], f'bytes 7-{len(data) - 1}/{len(data)}'),
+            ('bytes=-8', data[-8:], f'bytes {len(data) - 8}-{len(data) - 1}/{len(data)}'),
+            ('bytes=70-1000', data[70:], f'bytes 70-{len(data) - 1}/{len(data)}'),
+        ]:
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response.content, expected, header)
+            self.assertEqual(response['Content-Range'], content_range, header)
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=5-2', 'bytes=-', 'lines=1-2'):
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response['Content-Range'], f'bytes */{len(self.text)}')
+
+    def test_line_ranges(self):
+        for lines, expected in [('2-3', 'line 2\nline 3\n'), ('9-', 'line 9\nline 10\n'),
+                                ('-1', 'line 1\n'), ('11-', '')]:
+            response = self.client.get(self.url, {'lines': lines})
+            self.assertEqual(response.content.decode(), expected, lines)
+
+    def test_line_and_byte_range(self):
+        response = self.client.get(self.url, {'lines': '10-'}, HTTP_RANGE='bytes=5-')
+        self.assertEqual(response.content, b'10\n')
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url, {'lines': '-'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'lines': 'a-b'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'stream': 'source_code'}).status_code, 400)
+
+
+GPROF_REPORT = """Flat profile:
+
+Each sample counts as 0.01 seconds.
+  %   cumulative   self              self     total
+ time   seconds   seconds    calls  ms/call  ms/call  name
+ 60.00      0.06     0.06        1    60.00   100.00  slow()
+ 40.00      0.10     0.04  1000000     0.00     0.00  fast(int)
+  0.00      0.10     0.00                             frame_dummy
+
+\t\t\tCall graph
+
+granularity: each sample hit covers 4 byte(s) for 10.00% of 0.10 seconds
+"""
+
+
+@override_settings(EXECUTION_CALIBRATION={'ENABLED': False}, EXECUTION_PREFLIGHT={'ENABLED': False},
+                   EXECUTION_PROFILING={'ENABLED': True, 'TOP_N': 20})
+class ProfiledExecutionTests(TestCase):
+    """Profiled runs through the API, from the request to the download"""
+
+    def execute(self, source_code, language='python'):
+        return self.client.post('/api/execute/', {
+            'language': language, 'source_code': source_code, 'profile': True,
+        }, content_type='application/json')
+
+    def functions(self, data):
+        return ' '.join(function['function'] for function in data['profile']['functions'])
+
+    def test_profile_is_stored_and_downloadable(self):
+        response = self.execute('def work():\n    return sum(range(100000))\nprint(work())\n')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['status'], data['output'].strip()), ('completed', '4999950000'))
+        self.assertEqual(data['profile']['format'], 'pstats')
+        self.assertIsNone(data['profile']['error'])
+        self.assertIn('work (main.py:1)', self.functions(data))
+
+        execution = CodeExecution.objects.get(id=data['id'])
+        self.assertEqual(execution.profile_report['functions'], data['profile']['functions'])
+        self.assertEqual(data['profile']['download_url'], f'/api/execute/{execution.id}/profile/')
+        download = self.client.get(data['profile']['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download.content, execution.read_profile())
+        self.assertIn('.prof', download['Content-Disposition'])
+
+    @mock.patch.object(CodeExecutionService, 'EXECUTION_TIMEOUT', 1)
+    def test_program_stopped_at_its_limit_keeps_its_profile(self):
+        response = self.execute('def spin():\n    while True:\n        pass\nspin()\n')
+        data = response.json()
+        self.assertEqual(data['status'], 'timeout')
+        self.assertIsNone(data['profile']['error'])
+        self.assertIn('spin (main.py:1)', self.functions(data))
+        self.assertIn('download_url', data['profile'])
+
+    def test_rejected_when_the_profiler_is_missing(self):
+        tools = {'gprof': {'available': False, 'path': None, 'version': None}}
+        with mock.patch.dict(toolchain._state, tools=tools):
+            response = self.execute('int main() {}', language='cpp')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('needs gprof', str(response.json()['details']['profile']))
+        self.assertFalse(CodeExecution.objects.exists())
+
+
+class ProfileParserTests(SimpleTestCase):
+
+    def test_parse_gprof(self):
+        rows = profiling.parse_gprof(GPROF_REPORT)
+        self.assertEqual([row['function'] for row in rows], ['slow()', 'fast(int)', 'frame_dummy'])
+        self.assertEqual(rows[0]['calls'], 1)
+        self.assertAlmostEqual(rows[0]['self_time'], 0.06)
+        self.assertAlmostEqual(rows[0]['cumulative_time'], 0.1)
+        self.assertEqual(rows[1]['calls'], 1000000)
+        self.assertIsNone(rows[2]['calls'])
+        self.assertIsNone(rows[2]['cumulative_time'])
+
+    def test_parse_gprof_seconds_per_call(self):
+        report = GPROF_REPORT.replace('ms/call  ms/call', ' s/call   s/call').replace('100.00', '  2.50')
+        self.assertAlmostEqual(profiling.parse_gprof(report)[0]['cumulative_time'], 2.5)
+
+    def test_parse_cpuprofile(self):
+        def node(node_id, name, children=(), url='', line=0):
+            return {'id': node_id, 'children': list(children),
+                    'callFrame': {'functionName': name, 'url': url, 'lineNumber': line}}
+
+        rows = profiling.parse_cpuprofile({
+            'nodes': [
+                node(1, '(root)', [2, 4]),
+                node(2, '', [3], url='file:///tmp/main.js'),
+                node(3, 'slow', url='file:///tmp/main.js', line=4),
+                node(4, '(idle)'),
+            ],
+            'samples': [3, 3, 2, 4],
+            'timeDeltas': [1000, 2000, 500, 9000],
+        })
+        self.assertEqual([row['function'] for row in rows], ['slow (main.js:5)', '(anonymous) (main.js:1)'])
+        self.assertAlmostEqual(rows[0]['self_time'], 0.003)
+        self.assertAlmostEqual(rows[0]['cumulative_time'], 0.003)
+        self.assertAlmostEqual(rows[1]['self_time'], 0.0005)
+        self.assertAlmostEqual(rows[1]['cumulative_time'], 0.0035)
+
+
+class InputUploadHandlerTests(SimpleTestCase):
+
+    def upload(self, handler, *chunks):
+        handler.new_file('input_file', 'input.txt', 'text/plain', None)
+        start = 0
+        for chunk in chunks:
+            handler.receive_data_chunk(chunk, start)
+            start += len(chunk)
+        return handler.file_complete(start)
+
+    def test_hashes_while_streaming(self):
+        file = self.upload(InputUploadHandler(max_size=10), b'12345', b'67890')
+        self.assertEqual(file.size, 10)
+        self.assertEqual(file.sha256, 'c775e7b757ede630cd0aa1113bd102661ab38829ca52a6422ab782862f268646')
+        file.close()
+
+    def test_rejects_inputs_over_the_limit(self):
+        handler = InputUploadHandler(max_size=10)
+        with self.assertRaises(InputTooLarge):
+            self.upload(handler, b'123456', b'78901')
+        self.assertTrue(handler.file.closed)
+
+    @override_settings(EXECUTION_INPUT={'MAX_SIZE': 8}, EXECUTION_PREFLIGHT={'ENABLED': False})
+    def test_api_answers_413(self):
+        response = self.client.post('/api/execute/', {
+            'language': 'python',
+            'source_code': 'print(input())',
+            'input_file': SimpleUploadedFile('input.txt', b'0123456789'),
+        })
+        self.assertEqual(response.status_code, 413)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=1000, EXECUTION_PREFLIGHT={'ENABLED': False})
+    def test_oversized_json_body_answers_413(self):
+        for url in ('/api/execute/', '/api/execute/async/'):
+            with self.subTest(url=url):
+                response = self.client.post(url, {
+                    'language': 'python',
+                    'source_code': 'print(input())',
+                    'input_data': 'x' * 2000,
+                }, content_type='application/json')
+                self.assertEqual(response.status_code, 413)
+                self.assertEqual(response.json()['error'], 'Input too large')
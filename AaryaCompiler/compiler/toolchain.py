@@ -0,0 +1,226 @@
+# AaryaOnlineCompiler - Toolchain Preflight
+# Created by Aarya Agarwal
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+from django.conf import settings
+
+from .sandbox import SANDBOX_PATH
+
+logger = logging.getLogger(__name__)
+
+# Version probe for every external tool the runner uses
+TOOLS = {
+    'g++': ['--version'],
+    'python3': ['--version'],
+    'javac': ['-version'],
+    'java': ['-version'],
+    'node': ['--version'],
+    'timeout': ['--version'],
+    'gprof': ['--version'],
+    'jfr': ['version'],
+}
+
+# Tools each language needs
+LANGUAGE_TOOLS = {
+    'cpp': ['g++'],
+    'python': ['python3'],
+    'java': ['javac', 'java'],
+    'javascript': ['node'],
+}
+
+# Further tools a profiled run needs (see compiler/profiling.py): timeout(1)
+# to signal the program at its limit, and the report tool of the profiler
+PROFILER_TOOLS = {
+    'cpp': ['timeout', 'gprof'],
+    'python': ['timeout'],
+    'java': ['timeout', 'jfr'],
+    'javascript': ['timeout'],
+}
+
+# Trivial programs compiled and run once to warm compilers, runtimes and the page cache
+WARMUP_PROGRAMS = {
+    'cpp': '#include <iostream>\nint main() { std::cout << "ok" << std::endl; return 0; }\n',
+    'python': 'print("ok")\n',
+    'java': 'public class Main {\n    public static void main(String[] args) {\n        System.out.println("ok");\n    }\n}\n',
+    'javascript': 'console.log("ok");\n',
+}
+
+_state = {
+    'status': 'cold',
+    'tools': {},
+    'warmup': {},
+}
+_state_lock = threading.Lock()
+
+
+def _search_path() -> Optional[str]:
+    """PATH programs are resolved against: the sandbox's when it is enabled"""
+    if getattr(settings, 'EXECUTION_SANDBOX', {}).get('ENABLED', False):
+        return SANDBOX_PATH
+    return None
+
+
+def probe_tools() -> Dict[str, Dict]:
+    """Locate every tool and record its version, caching the results"""
+    tools = {}
+    for name, version_args in TOOLS.items():
+        path = shutil.which(name, path=_search_path())
+        info = {'available': path is not None, 'path': path, 'version': None}
+        if path is not None:
+            try:
+                process = subprocess.run(
+                    [path, *version_args], capture_output=True, text=True, timeout=30
+                )
+                lines = (process.stdout or process.stderr).strip().splitlines()
+                info['version'] = lines[0] if lines else ''
+            except (OSError, subprocess.TimeoutExpired) as e:
+                info['available'] = False
+                info['error'] = str(e)
+        tools[name] = info
+
+    with _state_lock:
+        _state['tools'] = tools
+    return tools
+
+
+def resolve(name: str) -> str:
+    """Return the probed absolute path of a tool, or its bare name if not probed yet"""
+    info = _state['tools'].get(name)
+    if info and info['path']:
+        return info['path']
+    return name
+
+
+def _missing(names: List[str]) -> List[str]:
+    tools = _state['tools']
+    return [name for name in names if name in tools and not tools[name]['available']]
+
+
+def missing_tools(language: str) -> List[str]:
+    """Tools ``language`` needs that the probe found missing (empty if not probed yet)"""
+    return _missing(LANGUAGE_TOOLS.get(language, []))
+
+
+def missing_profiler_tools(language: str) -> List[str]:
+    """Tools profiling ``language`` needs on top of its own that the probe found missing"""
+    return _missing(PROFILER_TOOLS.get(language, []))
+
+
+def warm_up() -> Dict[str, Dict]:
+    """Compile and run a trivial program in every language whose tools are present"""
+    # Imported here because services imports this module
+    from .services import CodeExecutionService
+
+    warmup = {}
+    for language, source_code in WARMUP_PROGRAMS.items():
+        if missing_tools(language):
+            warmup[language] = {'ok': False, 'skipped': True, 'error': 'toolchain missing'}
+            continue
+        start = time.perf_counter()
+        try:
+            result = CodeExecutionService._execute_program(language, source_code, '')
+            ok = result['success'] and result['output'].strip() == 'ok'
+            warmup[language] = {'ok': ok, 'seconds': round(time.perf_counter() - start, 3)}
+            if not ok:
+                warmup[language]['error'] = result['error'][:500]
+        except Exception as e:
+            warmup[language] = {'ok': False, 'error': str(e)}
+
+    with _state_lock:
+        _state['warmup'] = warmup
+    return warmup
+
+
+def run_preflight(warm: bool = True) -> Dict:
+    """Probe tools, optionally warm every language up, and update readiness"""
+    with _state_lock:
+        _state['status'] = 'warming'
+
+    os.makedirs(settings.TEMP_FILES_DIR, exist_ok=True)
+    probe_tools()
+    if warm:
+        warm_up()
+
+    with _state_lock:
+        _state['status'] = 'ready'
+    for name, info in _state['tools'].items():
+        if not info['available']:
+            logger.warning(f"Toolchain preflight: {name} is not available")
+    logger.info("Toolchain preflight finished")
+    return get_readiness()
+
+
+def get_readiness() -> Dict:
+    """
+    Readiness report for the health check. Workers report ready once
+    preflight has finished, or immediately when preflight is disabled.
+    """
+    config = getattr(settings, 'EXECUTION_PREFLIGHT', {})
+    with _state_lock:
+        status = _state['status']
+        if not config.get('ENABLED', False) and status == 'cold':
+            status = 'ready'
+        languages = {
+            language: not any(
+                name in _state['tools'] and not _state['tools'][name]['available']
+                for name in tools
+            ) and _state['warmup'].get(language, {}).get('ok', True)
+            for language, tools in LANGUAGE_TOOLS.items()
+        }
+        return {
+            'ready': status == 'ready',
+            'status': status,
+            'languages': languages,
+            'tools': dict(_state['tools']),
+            'warmup': dict(_state['warmup']),
+        }
+
+
+def start_background_preflight():
+    """Run preflight in a daemon thread so request handling is not delayed"""
+    config = getattr(settings, 'EXECUTION_PREFLIGHT', {})
+
+    def run():
+        try:
+            run_preflight(warm=config.get('WARM_UP', True))
+        except Exception as e:
+            logger.error(f"Toolchain preflight failed: {str(e)}")
+            with _state_lock:
+                _state['status'] = 'failed'
+
+    with _state_lock:
+        _state['status'] = 'warming'
+    threading.Thread(target=run, name='toolchain-preflight', daemon=True).start()
+
+
+_preflight_pid = None
+
+
+def ensure_preflight():
+    """
+    Start background preflight once per process, if it is enabled.
+    Called on every request (see PreflightMiddleware), so it runs in each
+    worker after the server has forked it: a thread started before the
+    fork (gunicorn --preload, uWSGI without lazy-apps) would not exist in
+    the workers, which would then never report ready.
+    """
+    global _preflight_pid
+
+    if _preflight_pid == os.getpid():
+        return
+    if not getattr(settings, 'EXECUTION_PREFLIGHT', {}).get('ENABLED', False):
+        return
+
+    with _state_lock:
+        if _preflight_pid == os.getpid():
+            return
+        _preflight_pid = os.getpid()
+        # State inherited from a parent process says nothing about this one
+        _state.update(status='cold', tools={}, warmup={})
+    start_background_preflight()
@@ -0,0 +1,73 @@
+# AaryaOnlineCompiler - Program Input Uploads
+# Created by Aarya Agarwal
+
+import hashlib
+from typing import Tuple
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Multipart field carrying an uploaded input file
+INPUT_FILE_FIELD = 'input_file'
+
+
+def max_input_size() -> int:
+    """Largest program input accepted, in bytes"""
+    return getattr(settings, 'EXECUTION_INPUT', {}).get('MAX_SIZE', 64 * 1024 * 1024)
+
+
+def text_digest(text: str) -> Tuple[int, str]:
+    """Return ``(size, sha256)`` of a text input as it is fed to the program"""
+    data = text.encode('utf-8')
+    return len(data), hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path: str) -> Tuple[int, str]:
+    """Return ``(size, sha256)`` of an input file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            size += len(chunk)
+            digest.update(chunk)
+    return size, digest.hexdigest()
+
+
+class InputTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Program input is too large'
+    default_code = 'input_too_large'
+
+
+class InputUploadHandler(TemporaryFileUploadHandler):
+    """
+    Spool uploaded program input straight to a temporary file.
+
+    The upload is hashed and measured chunk by chunk as it arrives, and the
+    request is aborted with InputTooLarge as soon as it passes the limit, so
+    an input is never held in memory and an oversized one is never fully
+    written to disk. The finished file carries a ``sha256`` attribute.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size if max_size is not None else max_input_size()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > self.max_size:
+            self.file.close()
+            raise InputTooLarge(f'Program input exceeds the {self.max_size} byte limit')
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
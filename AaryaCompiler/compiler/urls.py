@@ -6,5 +6,11 @@ from . import views
 
 urlpatterns = [
     path('execute/', views.ExecuteCodeView.as_view(), name='execute_code'),
+    path('execute/async/', views.AsyncExecuteCodeView.as_view(), name='execute_code_async'),
+    path('execute/search/', views.ExecutionSearchView.as_view(), name='execution_search'),
+    path('execute/<uuid:execution_id>/output/', views.ExecutionOutputView.as_view(), name='execution_output'),
+    path('execute/<uuid:execution_id>/profile/', views.ExecutionProfileView.as_view(), name='execution_profile'),
+    path('stress/', views.StressTestView.as_view(), name='stress_test'),
+    path('stress/<uuid:stress_test_id>/', views.StressTestDetailView.as_view(), name='stress_test_detail'),
     path('health/', views.HealthCheckView.as_view(), name='health_check'),
 ]
@@ -4,17 +4,37 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import JsonResponse
+from django.core.exceptions import RequestDataTooBig
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db import connections
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+import asyncio
+import json
 import logging
+import re
+import threading
+from contextlib import closing
+from typing import Union
 
-from .models import CodeExecution
+from .models import CodeExecution, StressTest
 from .serializers import (
     ExecuteCodeRequestSerializer,
     ExecuteCodeResponseSerializer,
-    CodeExecutionSerializer
+    CodeExecutionSerializer,
+    StressTestRequestSerializer,
+    StressTestSerializer
 )
-from .services import CodeExecutionService
+from .services import CodeExecutionService, StressTestService
+from .uploads import INPUT_FILE_FIELD, InputTooLarge, InputUploadHandler
+from . import profiling, search, toolchain
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -26,21 +46,135 @@ class HealthCheckView(APIView):
     """
     
     def get(self, request):
-        """Return API health status"""
+        """
+        Return API health status.
+        Responds 503 until toolchain preflight and warm-up have finished, so
+        load balancers only route to workers with predictable latency.
+        """
+        readiness = toolchain.get_readiness()
         return Response({
-            'status': 'healthy',
-            'message': 'AaryaOnlineCompiler API is running',
+            'status': 'healthy' if readiness['ready'] else readiness['status'],
+            'message': 'AaryaOnlineCompiler API is running' if readiness['ready']
+                       else 'AaryaOnlineCompiler API is warming up',
             'timestamp': timezone.now(),
             'version': '1.0.0',
-            'author': 'Aarya Agarwal'
-        })
+            'author': 'Aarya Agarwal',
+            'ready': readiness['ready'],
+            'languages': readiness['languages']
+        }, status=status.HTTP_200_OK if readiness['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+class ExecutionResponseMixin:
+    """
+    Shared input handling and response building for the sync and async
+    execution endpoints.
+    """
+    
+    COALESCED_NOTE = (
+        'This result was shared from an identical submission that was running at the same time. '
+        'Timing and any nondeterministic output (randomness, clocks, thread scheduling) come from '
+        'that run. Send "coalesce": false to get an independent run.'
+    )
+    
+    def _input_fields(self, validated_data: dict):
+        """
+        Describe the program input of a validated request.
+        Returns ``(fields, input_file)``: model fields for the execution and
+        the path of an uploaded input file, or None for inline input_data.
+        Uploaded files are not stored, only their size and hash; inline
+        input is measured and hashed by CodeExecutionService.
+        """
+        input_file = validated_data.get('input_file')
+        if input_file is not None:
+            return {
+                'input_data': '',
+                'input_size': input_file.size,
+                'input_sha256': input_file.sha256,
+            }, input_file.temporary_file_path()
+        
+        return {'input_data': validated_data.get('input_data', '')}, None
+    
+    def _input_too_large_data(self, error: Union[InputTooLarge, RequestDataTooBig]) -> dict:
+        # A JSON body over DATA_UPLOAD_MAX_MEMORY_SIZE is an oversized input too
+        return {
+            'error': 'Input too large',
+            'details': str(error)
+        }
+    
+    def _build_response_data(self, execution: CodeExecution) -> dict:
+        """Build the JSON body describing a finished execution"""
+        data = {
+            'id': str(execution.id),
+            'status': execution.status,
+            'output': execution.output,
+            'error_output': execution.error_output,
+            'output_size': execution.output_size,
+            'error_output_size': execution.error_output_size,
+            'input_size': execution.input_size,
+            'input_sha256': execution.input_sha256,
+            'output_truncated': execution.is_output_truncated('output'),
+            'error_output_truncated': execution.is_output_truncated('error_output'),
+            'profile': self._build_profile_data(execution),
+            'execution_time': execution.execution_time,
+            'run_time': execution.run_time,
+            'normalized_run_time': execution.normalized_run_time,
+            'time_limit': execution.time_limit,
+            'memory_used': execution.memory_used,
+            'assigned_core': execution.assigned_core,
+            'coalesced': execution.coalesced_from is not None,
+            'coalesced_from': str(execution.coalesced_from) if execution.coalesced_from else None,
+            'message': self._get_status_message(execution.status)
+        }
+        if execution.coalesced_from is not None:
+            data['note'] = self.COALESCED_NOTE
+        return data
+    
+    def _build_profile_data(self, execution: CodeExecution):
+        """Describe the profile of a profiled run, or None"""
+        if execution.profile_report is None:
+            return None
+        data = {
+            'format': execution.profile_report['format'],
+            'functions': execution.profile_report['functions'],
+            'error': execution.profile_report.get('error'),
+            'download_url': None,
+        }
+        if execution.profile_report.get('downloadable'):
+            data['download_url'] = reverse('execution_profile', args=[execution.id])
+        return data
+    
+    def _get_response_status(self, execution: CodeExecution) -> int:
+        """Return appropriate HTTP status based on execution result"""
+        if execution.status == 'completed':
+            return status.HTTP_200_OK
+        elif execution.status == 'timeout':
+            return status.HTTP_408_REQUEST_TIMEOUT
+        else:  # error
+            return status.HTTP_400_BAD_REQUEST
+    
+    def _get_status_message(self, status: str) -> str:
+        """
+        Get user-friendly status message based on execution status.
+        """
+        messages = {
+            'completed': 'Code executed successfully!',
+            'error': 'Code execution failed. Check the error output for details.',
+            'timeout': 'Code execution timed out. Your program may have an infinite loop or is taking too long.',
+            'pending': 'Code execution is pending...',
+            'running': 'Code is currently executing...'
+        }
+        return messages.get(status, 'Unknown status')
 
-class ExecuteCodeView(APIView):
+class ExecuteCodeView(ExecutionResponseMixin, APIView):
     """
     Main API endpoint for code execution.
     Handles POST requests with source code and returns execution results.
     """
     
+    def initialize_request(self, request, *args, **kwargs):
+        # Upload handlers must be in place before anything reads the body
+        request.upload_handlers = [InputUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+    
     def post(self, request):
         """
         Execute code submitted by the frontend.
@@ -49,16 +183,39 @@ class ExecuteCodeView(APIView):
         {
             "language": "cpp",
             "source_code": "#include<iostream>\nint main(){...}",
-            "input_data": "optional input for the program"
+            "input_data": "optional input for the program",
+            "coalesce": true,
+            "profile": false
         }
         
+        With "profile": true the program runs under its language's profiler
+        (cProfile, gprof, V8 --cpu-prof or JFR) within the usual time limit,
+        and the response carries the top functions by self time.
+        
+        Large inputs can instead be sent as multipart/form-data with the
+        same fields and an ``input_file`` part, which is spooled to disk and
+        streamed into the program's stdin.
+        
         Returns:
         {
             "id": "uuid",
             "status": "completed|error|timeout",
-            "output": "program output",
-            "error_output": "error messages if any",
+            "output": "program output (preview)",
+            "error_output": "error messages if any (preview)",
+            "output_size": 123,
+            "error_output_size": 0,
+            "input_size": 12,
+            "input_sha256": "hex digest of the input",
+            "output_truncated": false,
+            "error_output_truncated": false,
             "execution_time": 1.23,
+            "run_time": 0.85,
+            "normalized_run_time": 0.71,
+            "time_limit": 12.0,
+            "assigned_core": 2,
+            "coalesced": false,
+            "coalesced_from": null,
+            "profile": null,
             "message": "Success message"
         }
         """
@@ -72,40 +229,32 @@ class ExecuteCodeView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             validated_data = request_serializer.validated_data
+            input_fields, input_file = self._input_fields(validated_data)
             
             # Create code execution record
             execution = CodeExecution.objects.create(
                 language=validated_data['language'],
                 source_code=validated_data['source_code'],
-                input_data=validated_data.get('input_data', '')
+                **input_fields
             )
             
             logger.info(f"Starting code execution {execution.id} for language {execution.language}")
             
             # Execute the code
-            execution_result = CodeExecutionService.execute_code(execution)
+            execution_result = CodeExecutionService.execute_code(
+                execution, coalesce=validated_data['coalesce'], input_file=input_file,
+                profile=validated_data['profile']
+            )
             
             # Prepare response
-            response_data = {
-                'id': str(execution.id),
-                'status': execution.status,
-                'output': execution.output,
-                'error_output': execution.error_output,
-                'execution_time': execution.execution_time,
-                'memory_used': execution.memory_used,
-                'message': self._get_status_message(execution.status)
-            }
+            response_data = self._build_response_data(execution)
             
             logger.info(f"Code execution {execution.id} completed with status: {execution.status}")
             
-            # Return appropriate HTTP status based on execution result
-            if execution.status == 'completed':
-                return Response(response_data, status=status.HTTP_200_OK)
-            elif execution.status == 'timeout':
-                return Response(response_data, status=status.HTTP_408_REQUEST_TIMEOUT)
-            else:  # error
-                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-                
+            return Response(response_data, status=self._get_response_status(execution))
+        
+        except (InputTooLarge, RequestDataTooBig) as e:
+            return Response(self._input_too_large_data(e), status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
         except Exception as e:
             logger.error(f"Unexpected error in code execution: {str(e)}")
             return Response({
@@ -121,7 +270,9 @@ class ExecuteCodeView(APIView):
         """
         try:
             # Get recent executions (limit to last 10)
-            executions = CodeExecution.objects.all()[:10]
+            executions = CodeExecution.objects.defer(
+                'output_archive', 'error_output_archive', 'profile_archive'
+            )[:10]
             serializer = CodeExecutionSerializer(executions, many=True)
             
             return Response({
@@ -136,16 +287,352 @@ class ExecuteCodeView(APIView):
                 'error': 'Failed to retrieve execution history',
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ExecutionSearchView(APIView):
+    """
+    Full-text search over execution source code and output.
+    Uses the database's full-text index (SQLite FTS5 or PostgreSQL tsvector).
+    """
     
-    def _get_status_message(self, status: str) -> str:
+    # Upper bound for the limit query parameter
+    MAX_LIMIT = 100
+    
+    def get(self, request):
         """
-        Get user-friendly status message based on execution status.
+        Return executions matching every term of ``q``, best matches first.
+        
+        Query parameters:
+            q: search terms
+            limit: maximum number of results (default 20, at most 100)
         """
-        messages = {
-            'completed': 'Code executed successfully!',
-            'error': 'Code execution failed. Check the error output for details.',
-            'timeout': 'Code execution timed out. Your program may have an infinite loop or is taking too long.',
-            'pending': 'Code execution is pending...',
-            'running': 'Code is currently executing...'
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({
+                'error': 'Invalid request data',
+                'details': 'The q query parameter is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.MAX_LIMIT)
+        except ValueError:
+            return Response({
+                'error': 'Invalid request data',
+                'details': 'limit must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        executions = CodeExecution.objects.defer('output_archive', 'error_output_archive', 'profile_archive')
+        ids = search.search_execution_ids(query, limit=limit)
+        if ids is None:
+            matches = Q()
+            for field in search.SEARCH_FIELDS:
+                matches |= Q(**{f'{field}__icontains': query})
+            executions = list(executions.filter(matches)[:limit])
+        else:
+            rank = {execution_id: position for position, execution_id in enumerate(ids)}
+            executions = sorted(executions.filter(id__in=ids), key=lambda execution: rank[execution.id])
+        
+        serializer = CodeExecutionSerializer(executions, many=True)
+        return Response({
+            'executions': serializer.data,
+            'count': len(executions),
+            'message': 'Search completed successfully'
+        })
+
+class ExecutionOutputView(APIView):
+    """
+    Retrieve the full output of an execution.
+    Responses to /execute/ only carry a preview; this endpoint serves the
+    complete stream as plain text, optionally restricted to a byte range
+    (standard ``Range: bytes=...`` header) or a line range (``?lines=10-20``).
+    """
+    
+    RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+    LINES_PATTERN = re.compile(r'^(\d+)?-(\d+)?$')
+    
+    def get(self, request, execution_id):
+        """
+        Return the requested output stream.
+        
+        Query parameters:
+            stream: "output" (default) or "error_output"
+            lines: 1-based inclusive line range such as "10-20", "10-" or "-20"
+        """
+        stream = request.query_params.get('stream', 'output')
+        if stream not in CodeExecution.OUTPUT_STREAMS:
+            return Response({
+                'error': 'Invalid stream',
+                'details': f'stream must be one of: {", ".join(CodeExecution.OUTPUT_STREAMS)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        execution = get_object_or_404(CodeExecution, id=execution_id)
+        data = execution.read_output(stream)
+        
+        lines = request.query_params.get('lines')
+        if lines:
+            match = self.LINES_PATTERN.match(lines)
+            if not match or lines == '-':
+                return Response({
+                    'error': 'Invalid line range',
+                    'details': 'lines must look like "10-20", "10-" or "-20"'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            first = int(match.group(1)) if match.group(1) else 1
+            last = int(match.group(2)) if match.group(2) else None
+            data = b''.join(data.splitlines(keepends=True)[max(first, 1) - 1:last])
+        
+        byte_range = request.headers.get('Range')
+        if byte_range:
+            return self._ranged_response(data, byte_range)
+        
+        response = HttpResponse(data, content_type='text/plain; charset=utf-8')
+        response['Accept-Ranges'] = 'bytes'
+        return response
+    
+    def _ranged_response(self, data: bytes, byte_range: str) -> HttpResponse:
+        """Serve a single byte range of ``data`` as a 206 Partial Content response"""
+        total = len(data)
+        match = self.RANGE_PATTERN.match(byte_range.strip())
+        start = end = None
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else total - 1
+            else:
+                # Suffix range: the last N bytes
+                start = max(total - int(match.group(2)), 0)
+                end = total - 1
+        
+        if start is None or start >= total or end < start:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{total}'
+            return response
+        
+        end = min(end, total - 1)
+        response = HttpResponse(
+            data[start:end + 1],
+            content_type='text/plain; charset=utf-8',
+            status=status.HTTP_206_PARTIAL_CONTENT
+        )
+        response['Accept-Ranges'] = 'bytes'
+        response['Content-Range'] = f'bytes {start}-{end}/{total}'
+        return response
+
+class ExecutionProfileView(APIView):
+    """
+    Download the raw profile of a profiled execution: a cProfile stats file
+    (open with pstats or snakeviz), a gprof report, a V8 .cpuprofile (open in
+    Chrome DevTools) or a JFR recording (open in JDK Mission Control).
+    """
+    
+    def get(self, request, execution_id):
+        execution = get_object_or_404(
+            CodeExecution.objects.defer('output_archive', 'error_output_archive'), id=execution_id
+        )
+        if not execution.profile_archive:
+            return Response({
+                'error': 'No profile',
+                'details': 'This execution was not profiled or its profile was not stored'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        extension, content_type = profiling.FORMATS[execution.profile_report['format']]
+        response = HttpResponse(execution.read_profile(), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{execution.id}.{extension}"'
+        return response
+
+class AsyncEventStream:
+    """
+    NDJSON lines of a stress-test job for ASGI servers, sent as the events
+    happen. The job runs in a thread of its own, so its waits never hold up
+    the event loop or Django's thread for sync code. Django closes the
+    response, and with it this stream, when the client goes away; the job
+    is then closed at its next event.
+    """
+    
+    def __init__(self, events):
+        self.events = events
+        self._closed = threading.Event()
+    
+    def __aiter__(self):
+        return self._lines()
+    
+    def close(self):
+        self._closed.set()
+    
+    async def _lines(self):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        
+        def publish(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # The event loop is gone along with the client
+                pass
+        
+        def run_job():
+            try:
+                with closing(self.events):
+                    for event in self.events:
+                        if self._closed.is_set():
+                            break
+                        publish(event)
+            finally:
+                connections.close_all()
+                publish(None)
+        
+        threading.Thread(target=run_job, daemon=True).start()
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield json.dumps(event, cls=DjangoJSONEncoder) + '\n'
+        finally:
+            self.close()
+
+class StressTestView(APIView):
+    """
+    Stress-test a solution against a brute-force reference.
+    Progress is streamed back as newline-delimited JSON while the job runs.
+    """
+    
+    def post(self, request):
+        """
+        Start a stress test and stream its progress.
+        
+        Expected request body:
+        {
+            "generator": {"language": "python", "source_code": "..."},
+            "brute": {"language": "cpp", "source_code": "..."},
+            "solution": {"language": "cpp", "source_code": "..."},
+            "iterations": 1000,
+            "start_seed": 1
         }
-        return messages.get(status, 'Unknown status')
+        
+        The generator receives the seed as its first command-line argument
+        and prints one test input. The response is application/x-ndjson with
+        one event per line: "started", "compiled", periodic "progress"
+        events with iterations per second, and a final "finished" event
+        carrying the status and, for a failed test, the counterexample.
+        """
+        request_serializer = StressTestRequestSerializer(data=request.data)
+        if not request_serializer.is_valid():
+            return Response({
+                'error': 'Invalid request data',
+                'details': request_serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        validated_data = request_serializer.validated_data
+        stress_test = StressTest.objects.create(
+            generator_language=validated_data['generator']['language'],
+            generator_source=validated_data['generator']['source_code'],
+            brute_language=validated_data['brute']['language'],
+            brute_source=validated_data['brute']['source_code'],
+            solution_language=validated_data['solution']['language'],
+            solution_source=validated_data['solution']['source_code'],
+            iterations=validated_data['iterations'],
+            start_seed=validated_data['start_seed']
+        )
+        
+        logger.info(f"Starting stress test {stress_test.id} with {stress_test.iterations} iterations")
+        
+        events = StressTestService.run(stress_test)
+        # Under ASGI a sync iterator would be read to the end before anything is sent
+        stream = AsyncEventStream if isinstance(request._request, ASGIRequest) else self._stream
+        
+        response = StreamingHttpResponse(stream(events), content_type='application/x-ndjson')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream so progress reaches the client as it happens
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @staticmethod
+    def _stream(events):
+        """NDJSON lines of a job for WSGI servers"""
+        # Closing the response (e.g. on client disconnect) closes the job too
+        with closing(events):
+            for event in events:
+                yield json.dumps(event, cls=DjangoJSONEncoder) + '\n'
+
+class StressTestDetailView(APIView):
+    """
+    Retrieve the outcome of a stress test after its stream has ended.
+    """
+    
+    def get(self, request, stress_test_id):
+        stress_test = get_object_or_404(StressTest, id=stress_test_id)
+        return Response(StressTestSerializer(stress_test).data)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncExecuteCodeView(ExecutionResponseMixin, View):
+    """
+    Native async variant of ExecuteCodeView for ASGI deployments.
+    Runs the program with asyncio subprocesses so the worker is free to
+    supervise other executions while this one is in flight. Accepts the
+    same JSON or multipart body and returns the same response as
+    ExecuteCodeView.
+    """
+    
+    async def post(self, request):
+        """Execute code submitted by the frontend without blocking the event loop"""
+        try:
+            try:
+                if request.content_type == 'multipart/form-data':
+                    request.upload_handlers = [InputUploadHandler(request)]
+                    data = await asyncio.to_thread(self._parse_multipart, request)
+                else:
+                    try:
+                        data = json.loads(request.body or b'{}')
+                    except ValueError:
+                        return JsonResponse({
+                            'error': 'Invalid request data',
+                            'details': 'Request body must be valid JSON'
+                        }, status=status.HTTP_400_BAD_REQUEST)
+            except (InputTooLarge, RequestDataTooBig) as e:
+                return JsonResponse(self._input_too_large_data(e), status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            
+            request_serializer = ExecuteCodeRequestSerializer(data=data)
+            if not request_serializer.is_valid():
+                return JsonResponse({
+                    'error': 'Invalid request data',
+                    'details': request_serializer.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            validated_data = request_serializer.validated_data
+            input_fields, input_file = self._input_fields(validated_data)
+            
+            execution = await CodeExecution.objects.acreate(
+                language=validated_data['language'],
+                source_code=validated_data['source_code'],
+                **input_fields
+            )
+            
+            logger.info(f"Starting async code execution {execution.id} for language {execution.language}")
+            
+            await CodeExecutionService.aexecute_code(
+                execution, coalesce=validated_data['coalesce'], input_file=input_file,
+                profile=validated_data['profile']
+            )
+            
+            logger.info(f"Code execution {execution.id} completed with status: {execution.status}")
+            
+            return JsonResponse(
+                self._build_response_data(execution),
+                status=self._get_response_status(execution)
+            )
+        
+        except Exception as e:
+            logger.error(f"Unexpected error in async code execution: {str(e)}")
+            user = await request.auser()
+            return JsonResponse({
+                'error': 'Internal server error',
+                'message': 'An unexpected error occurred while executing your code',
+                'details': str(e) if user.is_staff else 'Contact support if this persists'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    @staticmethod
+    def _parse_multipart(request) -> dict:
+        """Parse a multipart body (blocking: uploads are spooled to disk)"""
+        data = request.POST.dict()
+        if INPUT_FILE_FIELD in request.FILES:
+            data[INPUT_FILE_FIELD] = request.FILES[INPUT_FILE_FIELD]
+        return data
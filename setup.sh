@@ -42,6 +42,14 @@ cd AaryaCompiler
 python manage.py makemigrations
 python manage.py migrate
 
+# Check compilers/runtimes and warm them up
+echo "🔍 Running toolchain preflight..."
+python manage.py preflight
+
+# Measure this node's speed so time limits are comparable across nodes
+echo "⏱ Calibrating time limits..."
+python manage.py calibrate_node
+
 # Create superuser (optional)
 echo ""
 read -p "Would you like to create a Django superuser? (y/n): " create_superuser